@@ -0,0 +1,247 @@
+"""Сквозные бенчмарки представлений блога.
+
+Запуск: pytest benchmarks --dataset=1k
+
+Данные создаёт seed_blog один раз на набор и хранит в
+benchmarks/.data/<набор>.sqlite3, изменения тестов откатываются.
+Результаты пишутся в JSON и сравниваются с benchmarks/baseline.json;
+--update-baseline записывает текущие результаты как новый baseline.
+
+Тест падает только из-за роста числа SQL-запросов: оно не зависит от
+машины. Задержка и объём ответа сравниваются для справки, и итог
+выводится в конце прогона. Медианы при этом пересчитываются на
+скорость машины: её мерит эталонная нагрузка, время которой записано
+в baseline рядом с результатами.
+"""
+import json
+import platform
+import statistics
+import time
+from http import HTTPStatus
+from datetime import datetime, timezone
+from pathlib import Path
+
+import django
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from blog.cache import invalidate_lookups
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+DATA_DIR = BENCHMARKS_DIR / ".data"
+
+DATASETS = {
+    "1k": dict(users=100, categories=10, locations=50,
+               posts=1_000, comments=5_000),
+    "100k": dict(users=5_000, categories=30, locations=500,
+                 posts=100_000, comments=500_000),
+    "1m": dict(users=50_000, categories=50, locations=2_000,
+               posts=1_000_000, comments=5_000_000),
+}
+
+# Медианы меньше миллисекунды шумят сильнее любого допуска
+LATENCY_SLACK_MS = 1.0
+
+recorder_key = pytest.StashKey()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmarks")
+    group.addoption("--dataset", choices=DATASETS, default="1k",
+                    help="Набор данных для замеров.")
+    group.addoption("--bench-rounds", type=int, default=30,
+                    help="Сколько раз выполнять каждый запрос.")
+    group.addoption("--bench-json", default=None,
+                    help="Куда записать результаты;"
+                         " по умолчанию benchmarks/results/<набор>.json.")
+    group.addoption("--bench-baseline",
+                    default=str(BENCHMARKS_DIR / "baseline.json"),
+                    help="Файл с результатами для сравнения.")
+    group.addoption("--bench-tolerance", type=float, default=0.5,
+                    help="Рост медианы и объёма ответа, о котором"
+                         " стоит предупредить.")
+    group.addoption("--update-baseline", action="store_true",
+                    help="Сохранить результаты как новый baseline.")
+
+
+@pytest.fixture(scope="session")
+def dataset(request):
+    return request.config.getoption("--dataset")
+
+
+@pytest.fixture(scope="session")
+def django_db_setup(dataset, django_db_blocker):
+    """База с засеянным набором вместо пустой тестовой базы."""
+    DATA_DIR.mkdir(exist_ok=True)
+    db_settings = connections["default"].settings_dict
+    db_settings["ENGINE"] = "django.db.backends.sqlite3"
+    db_settings["NAME"] = str(DATA_DIR / f"{dataset}.sqlite3")
+    connections["default"].close()
+    with django_db_blocker.unblock():
+        call_command("migrate", verbosity=0)
+        from blog.models import Post
+
+        if not Post.objects.exists():
+            call_command("seed_blog", **DATASETS[dataset])
+
+
+@pytest.fixture(autouse=True)
+def bench_settings():
+    # Панель отладки и DEBUG искажают замеры
+    with override_settings(DEBUG=False):
+        yield
+
+
+def reset_caches():
+    cache.clear()
+    invalidate_lookups()
+
+
+def percentile(timings, share):
+    return statistics.quantiles(timings, n=100, method="inclusive")[
+        share - 1
+    ]
+
+
+def calibrate(rounds=7):
+    """Медиана времени эталонной нагрузки, мс: мера скорости машины."""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        sorted(str(number * 7919 % 100_003) for number in range(200_000))
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+class BenchmarkRecorder:
+    """Собирает результаты замеров и сравнивает их с baseline."""
+
+    def __init__(self, config, dataset):
+        self.config = config
+        self.dataset = dataset
+        self.rounds = config.getoption("--bench-rounds")
+        self.tolerance = config.getoption("--bench-tolerance")
+        self.baseline_path = Path(config.getoption("--bench-baseline"))
+        self.baseline = {}
+        if self.baseline_path.exists():
+            self.baseline = json.loads(self.baseline_path.read_text())
+        self.expected = self.baseline.get(dataset, {})
+        self.calibration_ms = calibrate()
+        self.results = {}
+        self.warnings = []
+
+    def get_speed_ratio(self):
+        """Во сколько раз эта машина медленнее той, где снят baseline."""
+        expected = self.expected.get("calibration_ms")
+        return self.calibration_ms / expected if expected else 1.0
+
+    def measure(self, name, send, setup=None, cold=False,
+                status=HTTPStatus.OK):
+        """Замеряет запрос send() и возвращает метрики.
+
+        setup() выполняется перед каждым запросом вне замера; cold
+        очищает кэши, чтобы страница собиралась с нуля.
+        """
+        def prepare():
+            if setup is not None:
+                setup()
+            if cold:
+                reset_caches()
+
+        prepare()
+        with CaptureQueriesContext(connection) as captured:
+            response = send()
+        # Каждый запрос очищает журнал запросов, считаем сразу
+        queries = len(captured)
+        assert response.status_code == status, (
+            f"{name}: ответ {response.status_code} вместо {status}"
+        )
+        timings = []
+        for _ in range(self.rounds):
+            prepare()
+            start = time.perf_counter()
+            send()
+            timings.append((time.perf_counter() - start) * 1000)
+        metrics = {
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+            "queries": queries,
+            "bytes": len(response.content),
+        }
+        self.results[name] = metrics
+        self.check_regression(name, metrics)
+        return metrics
+
+    def check_regression(self, name, metrics):
+        if self.config.getoption("--update-baseline"):
+            return
+        expected = self.expected.get("results", {}).get(name)
+        if expected is None:
+            return
+        limit = 1 + self.tolerance
+        p50_limit = (expected["p50_ms"] * self.get_speed_ratio() * limit
+                     + LATENCY_SLACK_MS)
+        if metrics["p50_ms"] > p50_limit:
+            self.warnings.append(
+                f"{name}: медиана {metrics['p50_ms']} мс, в baseline"
+                f" {expected['p50_ms']} мс с поправкой на скорость машины"
+                f" {self.get_speed_ratio():.2f}"
+            )
+        if metrics["bytes"] > expected["bytes"] * limit:
+            self.warnings.append(
+                f"{name}: ответ {metrics['bytes']} байт,"
+                f" в baseline {expected['bytes']} байт"
+            )
+        assert metrics["queries"] <= expected["queries"], (
+            f"{name}: регрессия: запросов {metrics['queries']}"
+            f" вместо {expected['queries']}"
+        )
+
+    def save(self):
+        report = {
+            "dataset": self.dataset,
+            "rounds": self.rounds,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": settings.DATABASES["default"]["ENGINE"],
+            "calibration_ms": self.calibration_ms,
+            "results": self.results,
+        }
+        path = self.config.getoption("--bench-json") or (
+            BENCHMARKS_DIR / "results" / f"{self.dataset}.json"
+        )
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        if self.config.getoption("--update-baseline"):
+            expected = self.baseline.setdefault(self.dataset, {})
+            expected["calibration_ms"] = self.calibration_ms
+            expected.setdefault("results", {}).update(self.results)
+            self.baseline_path.write_text(json.dumps(
+                self.baseline, ensure_ascii=False, indent=2, sort_keys=True
+            ) + "\n")
+
+
+@pytest.fixture(scope="session")
+def bench(request, dataset):
+    recorder = BenchmarkRecorder(request.config, dataset)
+    request.config.stash[recorder_key] = recorder
+    yield recorder
+    if recorder.results:
+        recorder.save()
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    recorder = config.stash.get(recorder_key, None)
+    if recorder is None or not recorder.warnings:
+        return
+    terminalreporter.section("бенчмарки: для справки")
+    for line in recorder.warnings:
+        terminalreporter.write_line(line)
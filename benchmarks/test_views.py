@@ -0,0 +1,139 @@
+"""Задержка, число запросов и объём ответа основных страниц и действий.
+
+Каждая страница замеряется «холодной» (кэши очищены перед запросом)
+и «тёплой»; действия — формы создания, правки и удаления.
+"""
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+from django.db.models import Count, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.models import Category, Comment, Post, UserStats
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def targets():
+    """Самые нагруженные объекты набора: худший случай для страниц."""
+    now = timezone.now()
+    visible = Q(posts__is_published=True, posts__pub_date__lte=now)
+    author = UserStats.objects.select_related("user").order_by(
+        "-post_count", "pk"
+    ).first().user
+    category = Category.objects.filter(is_published=True).annotate(
+        n=Count("posts", filter=visible)
+    ).order_by("-n", "pk").first()
+    post = Post.objects.filter(
+        is_published=True, category__is_published=True, pub_date__lte=now
+    ).order_by("-comment_count", "pk").first()
+    own_post = Post.objects.filter(author=author).order_by("pk").first()
+    return SimpleNamespace(author=author, category=category, post=post,
+                           own_post=own_post)
+
+
+@pytest.fixture
+def author_client(client, targets):
+    client.force_login(targets.author)
+    return client
+
+
+def get_page_urls(targets):
+    return {
+        "index": reverse("blog:index"),
+        "index_page_2": reverse("blog:index") + "?page=2",
+        "category_posts": reverse("blog:category_posts",
+                                  args=[targets.category.slug]),
+        "post_detail": reverse("blog:post_detail", args=[targets.post.pk]),
+        "profile": reverse("blog:profile", args=[targets.author.username]),
+    }
+
+
+@pytest.mark.parametrize("cold", [True, False], ids=["cold", "warm"])
+@pytest.mark.parametrize("page", [
+    "index", "index_page_2", "category_posts", "post_detail", "profile",
+])
+def test_page(bench, client, targets, page, cold):
+    url = get_page_urls(targets)[page]
+    mode = "cold" if cold else "warm"
+    metrics = bench.measure(f"{page}:{mode}", lambda: client.get(url),
+                            cold=cold)
+    print(f"\n{page} ({mode}): {metrics}")
+
+
+def post_form_data(targets, title="Бенчмарк"):
+    return {
+        "title": title,
+        "text": "Текст публикации для замера.",
+        "pub_date": timezone.now().strftime("%Y-%m-%d %H:%M"),
+        "category": targets.category.pk,
+        "is_published": True,
+    }
+
+
+def test_create_post(bench, author_client, targets):
+    url = reverse("blog:create_post")
+    data = post_form_data(targets)
+    bench.measure("create_post", lambda: author_client.post(url, data),
+                  status=HTTPStatus.FOUND)
+
+
+def test_edit_post(bench, author_client, targets):
+    url = reverse("blog:edit_post", args=[targets.own_post.pk])
+    data = post_form_data(targets, title="Изменённый заголовок")
+    bench.measure("edit_post", lambda: author_client.post(url, data),
+                  status=HTTPStatus.FOUND)
+
+
+def test_delete_post(bench, author_client, targets):
+    current = {}
+
+    def setup():
+        current["post"] = Post.objects.create(
+            author=targets.author, **{
+                **post_form_data(targets),
+                "category": targets.category,
+                "pub_date": timezone.now(),
+            }
+        )
+
+    # Форма поста приходит и при удалении: DeleteView проверяет её
+    data = post_form_data(targets)
+    bench.measure("delete_post", lambda: author_client.post(
+        reverse("blog:delete_post", args=[current["post"].pk]), data
+    ), setup=setup, status=HTTPStatus.FOUND)
+
+
+def test_add_comment(bench, author_client, targets):
+    url = reverse("blog:add_comment", args=[targets.post.pk])
+    bench.measure("add_comment", lambda: author_client.post(
+        url, {"text": "Комментарий для замера"}
+    ), status=HTTPStatus.FOUND)
+
+
+def test_edit_comment(bench, author_client, targets):
+    comment = Comment.objects.create(
+        post=targets.post, author=targets.author, text="Комментарий"
+    )
+    url = reverse("blog:edit_comment", args=[targets.post.pk, comment.pk])
+    bench.measure("edit_comment", lambda: author_client.post(
+        url, {"text": "Изменённый комментарий"}
+    ), status=HTTPStatus.FOUND)
+
+
+def test_delete_comment(bench, author_client, targets):
+    current = {}
+
+    def setup():
+        current["comment"] = Comment.objects.create(
+            post=targets.post, author=targets.author, text="Комментарий"
+        )
+
+    bench.measure("delete_comment", lambda: author_client.post(
+        reverse("blog:delete_comment",
+                args=[targets.post.pk, current["comment"].pk]),
+        {"text": "Комментарий"}
+    ), setup=setup, status=HTTPStatus.FOUND)
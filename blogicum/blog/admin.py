@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Post, Category, Location, Comment
+from .models import Post, Category, Location, Comment, ImageJob
 
 
 # ...и регистрируем её в админке:
@@ -7,3 +7,4 @@ admin.site.register(Post)
 admin.site.register(Category)
 admin.site.register(Location)
 admin.site.register(Comment)
+admin.site.register(ImageJob)
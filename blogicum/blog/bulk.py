@@ -0,0 +1,255 @@
+"""Выгрузка и загрузка содержимого блога в формате JSON Lines.
+
+Каждая строка — объект {"model": ..., "pk": ..., "fields": {...}} в том
+же виде, что у dumpdata, поэтому файл понимает и loaddata. Модели идут
+в порядке зависимостей: при загрузке связанные объекты уже в базе.
+"""
+import datetime
+import json
+from contextlib import contextmanager
+from itertools import islice
+from time import monotonic
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core import serializers
+from django.core.serializers.base import DeserializationError
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from .cache import bump_feed_version, invalidate_lookups, purge_tags
+from .models import Category, Comment, ImageJob, Location, Post
+from .search import index_posts
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def format_rate(rows: int, started: float) -> str:
+    """Скорость с момента started (по monotonic) для сообщений команд."""
+    elapsed = monotonic() - started
+    return f'{rows / max(elapsed, 1e-6):.0f} строк/с'
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    """Сохраняет микросекунды, которые DjangoJSONEncoder отбрасывает."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def get_export_models() -> tuple:
+    return get_user_model(), Category, Location, Post, Comment
+
+
+def get_export_fields(model) -> List[str]:
+    # Связи многие-ко-многим (группы и права пользователей) не выгружаем:
+    # сериализатор читал бы их отдельным запросом на каждый объект,
+    # а первичные ключи прав в другой базе всё равно другие
+    return [field.name for field in model._meta.concrete_fields
+            if not field.primary_key]
+
+
+def iter_export_lines(model, batch_size: int = DEFAULT_BATCH_SIZE
+                      ) -> Iterator[str]:
+    """Строки JSON Lines со всеми объектами модели, по возрастанию pk.
+
+    Объекты читаются порциями через iterator(), память не растёт
+    с размером таблицы.
+    """
+    serializer = serializers.get_serializer('python')()
+    fields = get_export_fields(model)
+    objects = model._default_manager.order_by('pk').iterator(
+        chunk_size=batch_size
+    )
+    while True:
+        chunk = list(islice(objects, batch_size))
+        if not chunk:
+            return
+        for record in serializer.serialize(chunk, fields=fields):
+            yield json.dumps(record, cls=ExportEncoder,
+                             ensure_ascii=False)
+
+
+def iter_import_batches(stream, batch_size: int = DEFAULT_BATCH_SIZE,
+                        offset: int = 0
+                        ) -> Iterator[Tuple[List[dict], int]]:
+    """Порции записей из бинарного потока и смещение после каждой порции.
+
+    По смещению загрузку можно продолжить с места остановки.
+    """
+    batch = []
+    for line in stream:
+        offset += len(line)
+        if not line.strip():
+            continue
+        try:
+            batch.append(json.loads(line))
+        except ValueError as e:
+            raise DeserializationError(f'Некорректная строка: {e}') from e
+        if len(batch) >= batch_size:
+            yield batch, offset
+            batch = []
+    if batch:
+        yield batch, offset
+
+
+@contextmanager
+def preserve_auto_dates():
+    """Отключает auto_now и auto_now_add у выгружаемых моделей.
+
+    bulk_create, в отличие от loaddata, заполняет такие поля текущим
+    временем, а при загрузке нужны даты из файла.
+    """
+    changed = []
+    for model in get_export_models():
+        for field in model._meta.concrete_fields:
+            for attr in ('auto_now', 'auto_now_add'):
+                if getattr(field, attr, False):
+                    setattr(field, attr, False)
+                    changed.append((field, attr))
+    try:
+        yield
+    finally:
+        for field, attr in changed:
+            setattr(field, attr, True)
+
+
+# Первичные ключи из файла, занятые в базе другими объектами, по моделям
+Conflicts = Dict[type, Set[int]]
+
+
+def resolve_foreign_keys(model, objects: list,
+                         conflicts: Optional[Conflicts] = None) -> list:
+    """Сверяет внешние ключи с базой одним запросом на каждое поле.
+
+    Необязательная связь на отсутствующий объект обнуляется, как при
+    SET_NULL; объекты с обязательной битой связью отбрасываются. Связь
+    на объект, не загруженный из-за занятого ключа, тоже считается
+    битой: иначе она указала бы на чужой объект с тем же ключом.
+    """
+    conflicts = conflicts or {}
+    for field in model._meta.concrete_fields:
+        if not field.is_relation:
+            continue
+        ids = {getattr(obj, field.attname) for obj in objects} - {None}
+        if not ids:
+            continue
+        missing = ids - set(
+            field.related_model._default_manager.filter(
+                pk__in=ids
+            ).values_list('pk', flat=True)
+        ) | (ids & conflicts.get(field.related_model, set()))
+        if not missing:
+            continue
+        if field.null:
+            for obj in objects:
+                if getattr(obj, field.attname) in missing:
+                    setattr(obj, field.attname, None)
+        else:
+            objects = [obj for obj in objects
+                       if getattr(obj, field.attname) not in missing]
+    return objects
+
+
+def refresh_imported_posts(pks: List[int]) -> None:
+    """То, что при обычном сохранении делают сигналы постов."""
+    posts = Post.objects.filter(pk__in=pks)
+    index_posts(posts.only('pk', 'title', 'text'))
+    waiting = posts.exclude(image='').filter(image_ready=False).exclude(
+        pk__in=ImageJob.objects.filter(status__in=(
+            ImageJob.Status.PENDING, ImageJob.Status.RUNNING
+        )).values('post')
+    ).values_list('pk', flat=True)
+    ImageJob.objects.bulk_create(ImageJob(post_id=pk) for pk in waiting)
+
+
+def reset_caches() -> None:
+    """Сбрасывает ленты, страницы и справочники после записи без сигналов."""
+    bump_feed_version()
+    purge_tags('blog')
+    invalidate_lookups()
+
+
+def reset_sequences() -> None:
+    """Сдвигает счётчики первичных ключей за загруженные ключи.
+
+    bulk_create с явными pk их не трогает, и на PostgreSQL следующий
+    объект, созданный через сайт, получил бы уже занятый ключ.
+    """
+    statements = connection.ops.sequence_reset_sql(no_style(),
+                                                   get_export_models())
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def is_same_object(current, obj) -> bool:
+    """Совпадает ли объект в базе с объектом из файла по всем полям."""
+    return all(
+        field.value_from_object(current) == field.value_from_object(obj)
+        for field in current._meta.concrete_fields
+    )
+
+
+def save_group(model, objects: list, conflicts: Conflicts) -> Tuple[int, int]:
+    """Сохраняет объекты одной модели.
+
+    Объекты, чей ключ уже занят в базе, не сохраняются и не
+    перезаписывают существующие. Если в базе лежит тот же объект без
+    изменений, он считается загруженным: так порция, сохранённая перед
+    сбоем, но не отмеченная в файле прогресса, при --resume не теряет
+    связанные объекты. Возвращает число загруженных объектов и
+    объектов с занятым ключом.
+    """
+    objects = resolve_foreign_keys(model, objects, conflicts)
+    existing = model._default_manager.in_bulk(
+        [obj.pk for obj in objects if obj.pk is not None]
+    )
+    taken = {obj.pk for obj in objects if obj.pk in existing
+             and not is_same_object(existing[obj.pk], obj)}
+    if taken:
+        conflicts.setdefault(model, set()).update(taken)
+    new = [obj for obj in objects if obj.pk not in existing]
+    model._default_manager.bulk_create(new)
+    if model is Post:
+        refresh_imported_posts([obj.pk for obj in new])
+    return len(objects) - len(taken), len(taken)
+
+
+def load_records(records: List[dict],
+                 conflicts: Optional[Conflicts] = None
+                 ) -> Tuple[int, int, int]:
+    """Записывает порцию одной транзакцией.
+
+    Возвращает число загруженных объектов, отброшенных из-за битых
+    связей и пропущенных из-за занятого ключа. Занятые ключи копятся
+    в conflicts, чтобы следующие порции не ссылались на чужие объекты.
+    Подряд идущие объекты одной модели сохраняются одним bulk_create.
+    """
+    if conflicts is None:
+        conflicts = {}
+    allowed = set(get_export_models())
+    loaded = taken = 0
+    group, model = [], None
+    with transaction.atomic():
+        for item in serializers.deserialize('python', records,
+                                            ignorenonexistent=True):
+            obj = item.object
+            if type(obj) not in allowed:
+                raise DeserializationError(
+                    f'Модель {obj._meta.label} не поддерживается'
+                )
+            if type(obj) is not model and group:
+                saved, conflicting = save_group(model, group, conflicts)
+                loaded, taken = loaded + saved, taken + conflicting
+                group = []
+            model = type(obj)
+            group.append(obj)
+        if group:
+            saved, conflicting = save_group(model, group, conflicts)
+            loaded, taken = loaded + saved, taken + conflicting
+    return loaded, len(records) - loaded - taken, taken
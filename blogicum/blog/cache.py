@@ -0,0 +1,242 @@
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import md5
+from time import monotonic
+from threading import Lock
+from typing import Optional
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db.models import Min
+from django.utils import timezone
+from django.template.loader import render_to_string
+
+from .metrics import record_cache
+from .models import Category, Location, Post
+
+FEED_VERSION_KEY = 'blog:feed:version'
+FEED_CHANGED_KEY = 'blog:feed:changed'
+COMMENTS_VERSION_KEY = 'blog:feed:comments'
+# Верхняя граница жизни закэшированной страницы ленты, в секундах.
+FEED_CACHE_TIMEOUT = 60 * 15
+# Карточка поста меняет ключ при любом изменении поста или имени
+# автора, поэтому может жить долго.
+POST_CARD_TIMEOUT = 60 * 60 * 24
+# Категории и локации меняются редко: общий кэш держит их час,
+# а память процесса — несколько секунд, чтобы не ходить даже в кэш.
+LOOKUP_TIMEOUT = 60 * 60
+LOCAL_LOOKUP_TTL = 5
+# Отсутствующий slug может прислать кто угодно: промахи живут недолго
+LOOKUP_MISS_TIMEOUT = 60
+# Сколько справочников держит память процесса; самые старые вытесняются
+LOCAL_LOOKUP_MAX_SIZE = 1024
+
+_local_lookups = OrderedDict()
+_local_lookups_lock = Lock()
+
+
+def _get_version(key: str) -> str:
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def get_feed_version() -> str:
+    """Поколение ленты; меняется при изменении постов, категорий и локаций."""
+    return _get_version(FEED_VERSION_KEY)
+
+
+def get_comments_version() -> str:
+    """Поколение комментариев; меняется при любом изменении комментария.
+
+    От него зависят только списки постов на страницах ленты и время их
+    изменения: в них виден счётчик комментариев. Число постов
+    и справочники комментарии не меняют.
+    """
+    return _get_version(COMMENTS_VERSION_KEY)
+
+
+def bump_comments_version() -> None:
+    cache.set(COMMENTS_VERSION_KEY, uuid4().hex, None)
+
+
+def get_feed_changed_at() -> datetime:
+    """Когда в последний раз менялась версия ленты.
+
+    Если значение вытеснено из кэша, считаем, что только что: лишний
+    ответ 200 лучше устаревшего 304.
+    """
+    changed_at = cache.get(FEED_CHANGED_KEY)
+    if changed_at is None:
+        changed_at = timezone.now()
+        cache.add(FEED_CHANGED_KEY, changed_at, None)
+        changed_at = cache.get(FEED_CHANGED_KEY, changed_at)
+    return changed_at
+
+
+def bump_feed_version() -> None:
+    cache.set_many({
+        FEED_VERSION_KEY: uuid4().hex,
+        FEED_CHANGED_KEY: timezone.now(),
+    }, None)
+
+
+def get_next_publication(now: datetime) -> Optional[datetime]:
+    """Момент, когда в ленте появится ближайшая отложенная публикация."""
+    return Post.objects.filter(
+        is_published=True, pub_date__gt=now
+    ).aggregate(next_pub_date=Min('pub_date'))['next_pub_date']
+
+
+def get_feed_key(name: str, suffix,
+                 next_publication: Optional[datetime]) -> str:
+    """Ключ данных ленты, устаревающий при любом изменении постов.
+
+    Граница next_publication меняет ключ, когда выходит отложенный пост.
+    """
+    boundary = int(next_publication.timestamp()) if next_publication else 0
+    return f'blog:feed:{name}:{get_feed_version()}:{boundary}:{suffix}'
+
+
+def get_feed_page_timeout(now: datetime,
+                          next_publication: Optional[datetime]) -> int:
+    """Страница живёт не дольше, чем до выхода следующего поста."""
+    if next_publication is None:
+        return FEED_CACHE_TIMEOUT
+    seconds = int((next_publication - now).total_seconds()) + 1
+    return max(1, min(FEED_CACHE_TIMEOUT, seconds))
+
+
+def get_post_card_key(post_id: int, updated_at: datetime,
+                      comment_count: int, username: str) -> str:
+    # Имя автора и ссылка на его профиль тоже есть в карточке
+    return (f'blog:post_card:{post_id}:'
+            f'{updated_at.timestamp():.6f}:{comment_count}:{username}')
+
+
+def get_post_card_html(post) -> str:
+    """Отрендеренная карточка поста; рендерится только при промахе."""
+    key = get_post_card_key(post.pk, post.updated_at, post.comment_count,
+                            post.author.username)
+    html = cache.get(key)
+    record_cache('post_card', html is not None)
+    if html is None:
+        # Ленты не присоединяют локации, берём их из кэша
+        if post.location_id and not Post.location.is_cached(post):
+            post.location = get_cached_location(post.location_id)
+        html = render_to_string('includes/post_card.html', {'post': post})
+        cache.set(key, html, POST_CARD_TIMEOUT)
+    return html
+
+
+def invalidate_post_cards(posts) -> None:
+    """Удаляет карточки постов из переданного QuerySet."""
+    cache.delete_many([
+        get_post_card_key(*values)
+        for values in posts.values_list('pk', 'updated_at', 'comment_count',
+                                        'author__username')
+    ])
+
+
+def get_tag_versions(tags) -> dict:
+    """Текущие версии тегов; отсутствующие заводятся заново."""
+    keys = {tag: f'blog:tag:{tag}' for tag in tags}
+    stored = cache.get_many(keys.values())
+    versions = {}
+    for tag, key in keys.items():
+        if key not in stored:
+            cache.add(key, uuid4().hex, None)
+            stored[key] = cache.get(key)
+        versions[tag] = stored[key]
+    return versions
+
+
+def purge_tags(*tags) -> None:
+    """Удаление версии тега делает устаревшими все страницы с ним."""
+    cache.delete_many([f'blog:tag:{tag}' for tag in tags])
+
+
+def get_page_key(path: str) -> str:
+    return f'blog:page:{md5(path.encode()).hexdigest()}'
+
+
+def get_cached_page(path: str, versions: dict):
+    """Ответ из кэша страниц, если ни один из его тегов не сброшен."""
+    entry = cache.get(get_page_key(path))
+    hit = entry is not None and entry[0] == versions
+    record_cache('page', hit)
+    return entry[1] if hit else None
+
+
+def set_cached_page(path: str, versions: dict, response,
+                    timeout: int) -> None:
+    """Сохраняет ответ вместе с версиями тегов.
+
+    Версии берутся до рендеринга: сброс во время рендеринга
+    не даст сохранить устаревшую страницу под новыми версиями.
+    """
+    cache.set(get_page_key(path), (versions, response), timeout)
+
+
+def _get_lookup(key: str, loader):
+    """Объект из памяти процесса, общего кэша или, при промахе, из БД.
+
+    Отсутствующий объект кэшируется (как False) только в общем кэше
+    и ненадолго: повторы с несуществующим slug не доходят до базы,
+    но и не копятся в памяти процесса.
+    """
+    now = monotonic()
+    with _local_lookups_lock:
+        entry = _local_lookups.get(key)
+        if entry is not None and entry[0] > now:
+            _local_lookups.move_to_end(key)
+            record_cache('lookup', True)
+            return entry[1]
+    obj = cache.get(key)
+    record_cache('lookup', obj is not None)
+    if obj is None:
+        obj = loader() or False
+        cache.set(key, obj, LOOKUP_TIMEOUT if obj else LOOKUP_MISS_TIMEOUT)
+    if obj:
+        with _local_lookups_lock:
+            _local_lookups[key] = (now + LOCAL_LOOKUP_TTL, obj)
+            _local_lookups.move_to_end(key)
+            while len(_local_lookups) > LOCAL_LOOKUP_MAX_SIZE:
+                _local_lookups.popitem(last=False)
+    return obj or None
+
+
+def get_category_key(slug: str) -> str:
+    return f'blog:category:{slug}'
+
+
+def get_location_key(location_id: int) -> str:
+    return f'blog:location:{location_id}'
+
+
+def get_cached_category(slug: str) -> Optional[Category]:
+    """Категория по slug, опубликованная или нет."""
+    return _get_lookup(
+        get_category_key(slug),
+        lambda: Category.objects.filter(slug=slug).first()
+    )
+
+
+def get_cached_location(location_id: int) -> Optional[Location]:
+    return _get_lookup(
+        get_location_key(location_id),
+        lambda: Location.objects.filter(pk=location_id).first()
+    )
+
+
+def invalidate_lookups(*keys) -> None:
+    """Сбрасывает закэшированные категории и локации.
+
+    Память других процессов очистится сама через LOCAL_LOOKUP_TTL.
+    """
+    cache.delete_many(keys)
+    with _local_lookups_lock:
+        _local_lookups.clear()
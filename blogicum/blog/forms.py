@@ -1,9 +1,79 @@
 # blog/forms.py
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+from .images import downscale_image
+from .metrics import UPLOAD_SIZE
 from .models import Comment, Post
 
 
+class PostImageField(forms.ImageField):
+    """Поле изображения, которое не декодирует файл целиком.
+
+    Размер файла и изображения проверяются до декодирования: Pillow
+    читает из файла только заголовок. Слишком большие изображения
+    уменьшаются до BLOG_IMAGE_MAX_SIDE.
+    """
+
+    default_error_messages = {
+        'file_too_large': (
+            'Файл слишком большой (%(size)s). '
+            'Максимальный размер — %(limit)s.'
+        ),
+        'image_too_large': (
+            'Изображение слишком большое: больше %(limit)s мегапикселей.'
+        ),
+    }
+
+    def to_python(self, data):
+        # Базовый ImageField копирует загрузку в BytesIO и проверяет её
+        # через Pillow; здесь файл открывается на месте
+        f = forms.FileField.to_python(self, data)
+        if f is None:
+            return None
+        UPLOAD_SIZE.observe(f.size)
+        if f.size > settings.BLOG_IMAGE_MAX_UPLOAD_SIZE:
+            raise forms.ValidationError(
+                self.error_messages['file_too_large'],
+                code='file_too_large',
+                params={
+                    'size': filesizeformat(f.size),
+                    'limit': filesizeformat(
+                        settings.BLOG_IMAGE_MAX_UPLOAD_SIZE
+                    ),
+                },
+            )
+        try:
+            f.seek(0)
+            image = Image.open(f)
+            image.verify()
+        except Image.DecompressionBombError:
+            raise self._image_too_large(settings.BLOG_IMAGE_MAX_PIXELS)
+        except Exception as exc:
+            raise forms.ValidationError(
+                self.error_messages['invalid_image'], code='invalid_image'
+            ) from exc
+        limit = (settings.BLOG_IMAGE_MAX_PIXELS if image.format == 'JPEG'
+                 else settings.BLOG_IMAGE_MAX_DECODE_PIXELS)
+        if image.width * image.height > limit:
+            raise self._image_too_large(limit)
+        if max(image.size) > settings.BLOG_IMAGE_MAX_SIDE:
+            f = downscale_image(f, settings.BLOG_IMAGE_MAX_SIDE)
+        f.content_type = Image.MIME.get(image.format)
+        f.seek(0)
+        return f
+
+    def _image_too_large(self, limit):
+        return forms.ValidationError(
+            self.error_messages['image_too_large'],
+            code='image_too_large',
+            params={'limit': limit // 1_000_000},
+        )
+
+
 class UserEditForm(forms.ModelForm):
     class Meta:
         model = get_user_model()
@@ -20,3 +90,4 @@ class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         exclude = ('author',)
+        field_classes = {'image': PostImageField}
@@ -0,0 +1,105 @@
+from io import BytesIO
+from pathlib import PurePosixPath
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from PIL import Image, ImageOps
+
+# Ширины уменьшенных копий: карточка в ленте (40rem) и её 2x-версия
+RENDITION_WIDTHS = (640, 1280)
+RENDITION_FORMATS = {
+    'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+}
+
+
+def get_rendition_name(name: str, width: int, ext: str) -> str:
+    """Имя копии рядом с оригиналом: posts_images/photo.640w.webp."""
+    path = PurePosixPath(name)
+    return str(path.with_name(f'{path.stem}.{width}w.{ext}'))
+
+
+def generate_renditions(image, force: bool = False) -> int:
+    """Создаёт уменьшенные копии изображения и возвращает их число.
+
+    Копии шире оригинала не делаются: для маленьких картинок
+    шаблон отдаёт сам оригинал.
+    """
+    storage = image.storage
+    missing = {
+        (width, ext): get_rendition_name(image.name, width, ext)
+        for width in RENDITION_WIDTHS
+        for ext in RENDITION_FORMATS
+    }
+    if not force:
+        missing = {
+            key: name for key, name in missing.items()
+            if not storage.exists(name)
+        }
+    if not missing:
+        return 0
+
+    with storage.open(image.name) as fh:
+        with Image.open(fh) as original:
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ('RGB', 'L'):
+                original = original.convert('RGB')
+            created = 0
+            for (width, ext), name in missing.items():
+                if original.width <= width:
+                    continue
+                height = round(original.height * width / original.width)
+                resized = original.resize((width, height), Image.LANCZOS)
+                fmt, options = RENDITION_FORMATS[ext]
+                buffer = BytesIO()
+                resized.save(buffer, fmt, **options)
+                if force and storage.exists(name):
+                    storage.delete(name)
+                storage.save_as(name, ContentFile(buffer.getvalue()))
+                created += 1
+    return created
+
+
+def downscale_image(file, max_side: int) -> File:
+    """Уменьшает загруженное изображение, чтобы большая сторона <= max_side.
+
+    JPEG декодируется сразу в уменьшенном масштабе (draft), поэтому
+    в памяти не оказывается полноразмерный кадр. Результат пишется
+    во временный файл, если он больше FILE_UPLOAD_MAX_MEMORY_SIZE.
+    EXIF сохраняется: поворот и очистку делает фоновый обработчик.
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        fmt = image.format
+        exif = image.info.get('exif')
+        # Масштаб выбирается так, чтобы кадр был не меньше max_side
+        image.draft(image.mode, (max_side, max_side))
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        options = {'exif': exif} if exif else {}
+        if fmt == 'JPEG':
+            options.update(quality=90)
+        output = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        image.save(output, fmt, **options)
+    output.seek(0)
+    return File(output, name=file.name)
+
+
+def delete_renditions(storage, name: str) -> None:
+    for width in RENDITION_WIDTHS:
+        for ext in RENDITION_FORMATS:
+            storage.delete(get_rendition_name(name, width, ext))
+
+
+def get_renditions(image) -> dict:
+    """Существующие копии изображения: {'webp': [(url, ширина)], ...}."""
+    storage = image.storage
+    renditions = {ext: [] for ext in RENDITION_FORMATS}
+    for width in RENDITION_WIDTHS:
+        for ext in RENDITION_FORMATS:
+            name = get_rendition_name(image.name, width, ext)
+            if storage.exists(name):
+                renditions[ext].append((storage.url(name), width))
+    return renditions
@@ -0,0 +1,153 @@
+import logging
+from datetime import timedelta
+from io import BytesIO
+from pathlib import PurePosixPath
+from typing import Optional
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .images import generate_renditions
+from .media import release_file
+from .models import ImageJob, Post
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз пробуем обработать изображение, прежде чем сдаться
+MAX_ATTEMPTS = 3
+# Задание «выполняется» дольше этого — значит, обработчик упал
+STALE_AFTER = timedelta(minutes=10)
+# Пауза перед повтором; удваивается с каждой неудачной попыткой
+RETRY_DELAY = timedelta(minutes=1)
+
+# Форматы, которые сохраняем как есть; остальное приводим к JPEG
+KEEP_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+
+def enqueue_image_job(post: Post) -> ImageJob:
+    return ImageJob.objects.create(post=post)
+
+
+def requeue_stale_jobs() -> int:
+    """Возвращает в очередь задания упавших обработчиков."""
+    return ImageJob.objects.filter(
+        status=ImageJob.Status.RUNNING,
+        started_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status=ImageJob.Status.PENDING)
+
+
+def claim_next_job() -> Optional[ImageJob]:
+    """Забирает самое старое задание из очереди.
+
+    Статус меняется условным UPDATE, поэтому одно задание не достанется
+    двум обработчикам одновременно. Задания, отложенные после ошибки,
+    ждут своего run_after.
+    """
+    pending = ImageJob.objects.filter(
+        Q(run_after__isnull=True) | Q(run_after__lte=timezone.now()),
+        status=ImageJob.Status.PENDING,
+    )
+    for job_id in pending.order_by('created_at').values_list(
+        'pk', flat=True
+    )[:10]:
+        claimed = pending.filter(pk=job_id).update(
+            status=ImageJob.Status.RUNNING, started_at=timezone.now()
+        )
+        if claimed:
+            return ImageJob.objects.select_related('post').get(pk=job_id)
+    return None
+
+
+def clean_image(post: Post) -> str:
+    """Поворачивает изображение по EXIF и пересохраняет без метаданных.
+
+    Возвращает имя очищенного файла в хранилище; ссылку на него,
+    взятую хранилищем, забирает apply_cleaned_image.
+    """
+    image = post.image
+    with image.storage.open(image.name) as fh:
+        with Image.open(fh) as original:
+            fmt = original.format
+            if fmt not in KEEP_FORMATS:
+                fmt = 'JPEG'
+            cleaned = ImageOps.exif_transpose(original)
+            if fmt == 'JPEG' and cleaned.mode not in ('RGB', 'L'):
+                cleaned = cleaned.convert('RGB')
+            buffer = BytesIO()
+            # Метаданные (EXIF, GPS) не передаём — они не сохранятся
+            cleaned.save(buffer, fmt, quality=90)
+    path = PurePosixPath(image.name)
+    name = str(path.with_name(f'{path.stem}.{KEEP_FORMATS[fmt]}'))
+    return image.storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def apply_cleaned_image(post: Post, raw_name: str) -> bool:
+    """Подменяет загруженный файл очищенным, если пост не успели изменить."""
+    with transaction.atomic():
+        current = Post.objects.select_for_update().filter(
+            pk=post.pk
+        ).values_list('image', flat=True).first()
+        if current != raw_name:
+            return False
+        post.image_ready = True
+        post._image_retained = True
+        post.save(update_fields=['image', 'image_ready', 'updated_at'])
+    return True
+
+
+def drop_unprocessed_image(post: Post, raw_name: str) -> bool:
+    """Убирает из поста изображение, которое так и не удалось обработать.
+
+    Исходный файл может содержать EXIF с координатами, поэтому вместо
+    него не показываем ничего; файл освободит сигнал сохранения поста.
+    """
+    with transaction.atomic():
+        current = Post.objects.select_for_update().filter(
+            pk=post.pk
+        ).values_list('image', flat=True).first()
+        if current != raw_name:
+            return False
+        post.image = ''
+        post.image_ready = True
+        post.save(update_fields=['image', 'image_ready', 'updated_at'])
+    return True
+
+
+def process_image_job(job: ImageJob) -> None:
+    post = job.post
+    attempts = job.attempts + 1
+    status, error, run_after = ImageJob.Status.DONE, '', None
+    raw_name = cleaned_name = None
+    try:
+        if post.image:
+            raw_name = post.image.name
+            cleaned_name = clean_image(post)
+            post.image.name = cleaned_name
+            generate_renditions(post.image)
+            # Загруженный оригинал освободит сигнал сохранения поста
+            if apply_cleaned_image(post, raw_name):
+                cleaned_name = None
+    except Exception as e:
+        # Не только ошибки ввода-вывода: битый EXIF или слишком большое
+        # изображение иначе роняли бы обработчик на каждой попытке
+        logger.exception('Не удалось обработать изображение поста %s',
+                         job.post_id)
+        error = str(e) or type(e).__name__
+        if attempts >= MAX_ATTEMPTS:
+            status = ImageJob.Status.FAILED
+            if raw_name:
+                drop_unprocessed_image(post, raw_name)
+        else:
+            status = ImageJob.Status.PENDING
+            run_after = timezone.now() + RETRY_DELAY * 2 ** (attempts - 1)
+    if cleaned_name:
+        # Очищенная копия не попала в пост из-за ошибки или потому, что
+        # пост успели изменить: она и её уменьшенные версии не нужны
+        release_file(cleaned_name)
+    # Пост могли удалить вместе с заданием — обновляем без исключений
+    ImageJob.objects.filter(pk=job.pk).update(
+        status=status, attempts=attempts, error=error, run_after=run_after
+    )
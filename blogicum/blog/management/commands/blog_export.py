@@ -0,0 +1,46 @@
+import sys
+from time import monotonic
+
+from django.core.management.base import BaseCommand
+
+from blog.bulk import (DEFAULT_BATCH_SIZE, format_rate, get_export_models,
+                       iter_export_lines)
+
+
+class Command(BaseCommand):
+    help = ('Выгружает пользователей, категории, локации, посты'
+            ' и комментарии в файл JSON Lines для blog_import.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл для выгрузки; «-» — стандартный вывод.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Сколько объектов читать из базы за один запрос.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        # При выводе в stdout сообщения не должны смешиваться с данными
+        log = self.stderr if path == '-' else self.stdout
+        started = monotonic()
+        total = 0
+        output = (sys.stdout if path == '-'
+                  else open(path, 'w', encoding='utf-8'))
+        try:
+            for model in get_export_models():
+                rows = 0
+                for line in iter_export_lines(model, options['batch_size']):
+                    output.write(line + '\n')
+                    rows += 1
+                total += rows
+                if options['verbosity'] >= 2:
+                    log.write(f'{model._meta.label}: {rows}')
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        log.write(self.style.SUCCESS(
+            f'Выгружено строк: {total} за {monotonic() - started:.1f} с'
+            f' ({format_rate(total, started)})'
+        ))
@@ -0,0 +1,101 @@
+import json
+import os
+from pathlib import Path
+from time import monotonic
+
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+from django.db import DatabaseError
+
+from blog.bulk import (DEFAULT_BATCH_SIZE, format_rate, iter_import_batches,
+                       load_records, preserve_auto_dates, reset_caches,
+                       reset_sequences)
+
+
+class Command(BaseCommand):
+    help = ('Загружает файл JSON Lines из blog_export порциями через'
+            ' bulk_create. Изображения постов нужно скопировать отдельно.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл, созданный blog_export.')
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Сколько строк сохранять одной транзакцией.'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванную загрузку с последней сохранённой'
+                 ' порции.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        checkpoint = Path(f'{path}.progress')
+        offset = rows = 0
+        conflicts = {}
+        if options['resume'] and checkpoint.exists():
+            state = json.loads(checkpoint.read_text())
+            offset, rows = state['offset'], state['rows']
+            conflicts = {apps.get_model(label): set(pks) for label, pks
+                         in state.get('conflicts', {}).items()}
+            self.stdout.write(f'Продолжаем после строки {rows}')
+
+        started = monotonic()
+        loaded = skipped = taken = 0
+        try:
+            with open(path, 'rb') as stream, preserve_auto_dates():
+                stream.seek(offset)
+                for records, offset in iter_import_batches(
+                    stream, options['batch_size'], offset
+                ):
+                    saved, dropped, conflicting = load_records(records,
+                                                               conflicts)
+                    loaded += saved
+                    skipped += dropped
+                    taken += conflicting
+                    rows += len(records)
+                    self.save_checkpoint(checkpoint, offset, rows, conflicts)
+                    if options['verbosity'] >= 2:
+                        self.stdout.write(
+                            f'Строк: {rows} ({format_rate(rows, started)})'
+                        )
+        except (DeserializationError, DatabaseError) as e:
+            raise CommandError(
+                f'Ошибка после строки {rows}: {e}. Исправьте файл или базу'
+                ' и запустите команду с --resume.'
+            ) from e
+        finally:
+            # Уже сохранённые порции должны работать и до --resume
+            reset_sequences()
+
+        self.refresh_derived_data()
+        checkpoint.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено объектов: {loaded}, пропущено из-за отсутствующих'
+            f' связей: {skipped}, из-за занятых ключей: {taken}'
+            f' ({format_rate(loaded + skipped + taken, started)})'
+        ))
+        if taken:
+            self.stderr.write(
+                'Объекты с ключами, уже занятыми в базе, не загружены, и'
+                ' ссылки на них тоже: загружайте в пустую базу.'
+            )
+
+    @staticmethod
+    def save_checkpoint(checkpoint, offset, rows, conflicts):
+        # Запись через временный файл: при сбое не останется обрывка
+        tmp = checkpoint.with_name(checkpoint.name + '.tmp')
+        tmp.write_text(json.dumps({
+            'offset': offset,
+            'rows': rows,
+            'conflicts': {model._meta.label_lower: sorted(pks)
+                          for model, pks in conflicts.items()},
+        }))
+        os.replace(tmp, checkpoint)
+
+    def refresh_derived_data(self):
+        """bulk_create не вызывает сигналы: счётчики и кэш обновляем сами."""
+        call_command('recalculate_counters', stdout=self.stdout)
+        reset_caches()
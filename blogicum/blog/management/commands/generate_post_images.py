@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from blog.images import generate_renditions
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии изображений для существующих постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать копии, даже если они уже есть.'
+        )
+
+    def handle(self, *args, **options):
+        # Необработанные изображения копии получат от фонового обработчика
+        posts = Post.objects.exclude(image='').filter(
+            image_ready=True
+        ).only('pk', 'image')
+        processed = created = failed = 0
+        for post in posts.iterator():
+            try:
+                created += generate_renditions(post.image, options['force'])
+            except Exception as e:
+                # Битый файл не должен останавливать обработку остальных
+                failed += 1
+                self.stderr.write(f'Пост {post.pk}: {e or type(e).__name__}')
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано постов: {processed}, создано копий: {created}, '
+            f'ошибок: {failed}'
+        ))
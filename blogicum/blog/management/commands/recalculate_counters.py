@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.bulk import DEFAULT_BATCH_SIZE
+from blog.media import recount_file_refs
+from blog.models import Comment, Post
+from blog.stats import recalculate_all_user_stats
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает денормализованные счётчики комментариев постов,'
+            ' ссылок на изображения и статистику пользователей.')
+
+    def handle(self, *args, **options):
+        counts = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(n=Count('pk')).values('n')
+        actual = Coalesce(Subquery(counts), 0)
+        with transaction.atomic():
+            fixed = Post.objects.annotate(
+                actual_count=actual
+            ).exclude(comment_count=F('actual_count')).update(
+                comment_count=actual
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков комментариев: {fixed}'
+        ))
+
+        with transaction.atomic():
+            files = recount_file_refs()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков ссылок на файлы: {files}'
+        ))
+
+        users = recalculate_all_user_stats(DEFAULT_BATCH_SIZE)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитана статистика пользователей: {users}'
+        ))
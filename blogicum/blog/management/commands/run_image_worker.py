@@ -0,0 +1,48 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.jobs import claim_next_job, process_image_job, requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = ('Фоновый обработчик изображений постов: '
+            'очищает EXIF, поворачивает и создаёт уменьшенные копии.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Пауза между опросами пустой очереди, в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f'Возвращено в очередь заданий: {requeued}')
+
+        processed = 0
+        while self.running:
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+            process_image_job(job)
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано заданий: {processed}'
+        ))
+
+    def stop(self, signum, frame):
+        # Текущее задание доделываем, новых не берём
+        self.running = False
@@ -0,0 +1,85 @@
+from time import monotonic
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.bulk import (DEFAULT_BATCH_SIZE, format_rate, preserve_auto_dates,
+                       reset_caches)
+from blog.seed import SEED_PASSWORD, Seeder
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, категориями,'
+            ' локациями, постами и комментариями для оценки нагрузки.')
+
+    def add_arguments(self, parser):
+        for name, default in (('users', 1000), ('categories', 20),
+                              ('locations', 100), ('posts', 10000),
+                              ('comments', 50000)):
+            parser.add_argument(
+                f'--{name}', type=int, default=default,
+                help=f'Сколько создать, по умолчанию {default}.'
+            )
+        parser.add_argument(
+            '--scheduled', type=float, default=0.05,
+            help='Доля отложенных постов.'
+        )
+        parser.add_argument(
+            '--unpublished', type=float, default=0.05,
+            help='Доля постов, снятых с публикации.'
+        )
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='Показатель степенного закона: чем больше, тем сильнее'
+                 ' посты и комментарии сосредоточены у немногих.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора: один seed — одни данные.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='Сколько объектов сохранять одной транзакцией.'
+        )
+
+    def handle(self, *args, **options):
+        if options['posts'] and not (options['users']
+                                     and options['categories']):
+            raise CommandError('Для постов нужны пользователи и категории.')
+        seeder = Seeder(options['seed'], options['batch_size'],
+                        options['exponent'])
+        if get_user_model().objects.filter(
+            username__startswith=f'{seeder.prefix}_'
+        ).exists():
+            raise CommandError(
+                f'Данные с seed {options["seed"]} уже созданы,'
+                ' укажите другой --seed.'
+            )
+
+        started = monotonic()
+        total = 0
+        with preserve_auto_dates():
+            for label, create, args in (
+                ('Пользователей', seeder.create_users, ()),
+                ('Категорий', seeder.create_categories, ()),
+                ('Локаций', seeder.create_locations, ()),
+                ('Постов', seeder.create_posts,
+                 (options['scheduled'], options['unpublished'])),
+                ('Комментариев', seeder.create_comments, ()),
+            ):
+                step_started = monotonic()
+                key = create.__name__.replace('create_', '')
+                rows = create(options[key], *args)
+                total += rows
+                self.stdout.write(
+                    f'{label}: {rows}'
+                    f' ({format_rate(rows, step_started)})'
+                )
+        call_command('recalculate_counters', stdout=self.stdout)
+        reset_caches()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {total} за {monotonic() - started:.1f} с'
+            f' ({format_rate(total, started)}).'
+            f' Пароль пользователей: {SEED_PASSWORD}'
+        ))
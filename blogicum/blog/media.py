@@ -0,0 +1,215 @@
+import mimetypes
+import os
+import re
+from http import HTTPStatus
+from stat import S_ISREG
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .images import delete_renditions
+from .models import MediaFile, Post
+from .storage import is_hashed_name, post_image_storage
+
+# Файлы с хешем в имени не меняются, их можно кешировать навсегда
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def retain_file(name: str) -> None:
+    """Увеличивает счётчик ссылок на файл."""
+    if MediaFile.objects.filter(name=name).update(
+        ref_count=F('ref_count') + 1
+    ):
+        return
+    try:
+        with transaction.atomic():
+            MediaFile.objects.create(name=name, ref_count=1)
+    except IntegrityError:
+        # Запись успел создать параллельный запрос
+        MediaFile.objects.filter(name=name).update(
+            ref_count=F('ref_count') + 1
+        )
+
+
+def release_file(name: str) -> None:
+    """Уменьшает счётчик ссылок; файл без ссылок удаляется после коммита."""
+    MediaFile.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1
+    )
+    transaction.on_commit(lambda: delete_orphan(name))
+
+
+def delete_orphan(name: str) -> bool:
+    """Удаляет файл и его копии, если на него больше никто не ссылается.
+
+    Файл удаляется под блокировкой строки счётчика: retain_file из
+    параллельного сохранения ждёт коммита и уже не найдёт файл, так
+    что хранилище запишет его заново.
+    """
+    with transaction.atomic():
+        # Строку без счётчика тоже заводим, чтобы было что блокировать
+        media, _ = MediaFile.objects.select_for_update().get_or_create(
+            name=name
+        )
+        if media.ref_count:
+            return False
+        media.delete()
+        delete_renditions(post_image_storage, name)
+        post_image_storage.delete(name)
+    return True
+
+
+def recount_file_refs() -> int:
+    """Пересчитывает ссылки на файлы по постам.
+
+    Нужен после записи постов в обход сигналов, например bulk_create.
+    Возвращает число файлов, счётчик которых изменился или завёлся.
+    """
+    refs = Post.objects.filter(image=OuterRef('name')).order_by().values(
+        'image').annotate(n=Count('pk')).values('n')
+    actual = Coalesce(Subquery(refs), 0)
+    fixed = MediaFile.objects.annotate(actual_count=actual).exclude(
+        ref_count=F('actual_count')
+    ).update(ref_count=actual)
+    missing = Post.objects.exclude(image='').exclude(
+        image__in=MediaFile.objects.values('name')
+    ).values('image').annotate(n=Count('pk')).order_by()
+    created = MediaFile.objects.bulk_create(
+        MediaFile(name=row['image'], ref_count=row['n']) for row in missing
+    )
+    return fixed + len(created)
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Разбирает Range: bytes=start-end и возвращает границы включительно.
+
+    None — диапазон не указан или не поддерживается (несколько частей),
+    файл отдаётся целиком. Для диапазона за концом файла — ValueError.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end:
+            return None
+        # bytes=-500 — последние 500 байт
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end or size - 1), size - 1)
+    if start >= size or start > end:
+        raise ValueError('Диапазон вне файла')
+    return start, end
+
+
+class FileRange:
+    """Файл, из которого читается только часть [start, end]."""
+
+    def __init__(self, file, start: int, end: int):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = end - start + 1
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def get_media_cache_control(path: str) -> dict:
+    if is_hashed_name(path):
+        return {'public': True, 'max_age': IMMUTABLE_MAX_AGE,
+                'immutable': True}
+    return {'public': True, 'max_age': settings.BLOG_MEDIA_MAX_AGE}
+
+
+def serve_media(request, path):
+    """Отдаёт загруженные файлы без участия django.views.static.
+
+    Поддерживает условные запросы и Range. Если перед Django стоит
+    nginx или Apache, передачу файла можно отдать им через
+    X-Accel-Redirect или X-Sendfile (настройка BLOG_MEDIA_SENDFILE);
+    иначе FileResponse позволяет WSGI-серверу использовать sendfile.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Файл не найден')
+    if not S_ISREG(stat.st_mode):
+        raise Http404('Файл не найден')
+
+    etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = build_media_response(request, path, full_path, stat,
+                                        etag, last_modified)
+    response.headers.setdefault('ETag', etag)
+    response.headers.setdefault('Last-Modified', http_date(last_modified))
+    patch_cache_control(response, **get_media_cache_control(path))
+    return response
+
+
+def build_media_response(request, path, full_path, stat,
+                         etag, last_modified):
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    sendfile = settings.BLOG_MEDIA_SENDFILE
+    if sendfile:
+        # Файл, диапазоны и условные запросы обслужит фронт-сервер
+        response = HttpResponse(content_type=content_type)
+        if sendfile == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = (
+                settings.BLOG_MEDIA_ACCEL_PREFIX + quote(path)
+            )
+        else:
+            response['X-Sendfile'] = str(full_path)
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if if_range is None or if_range in (etag, http_date(last_modified)):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            response = HttpResponse(
+                status=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+            )
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    file = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(FileRange(file, start, end),
+                                content_type=content_type,
+                                status=HTTPStatus.PARTIAL_CONTENT)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,333 @@
+"""Метрики блога в текстовом формате Prometheus.
+
+Значения копятся в памяти процесса. Если задан BLOG_METRICS_DIR, каждый
+процесс (например, воркер gunicorn) пишет их в свой файл в этом
+каталоге через mmap, а /metrics суммирует файлы всех процессов.
+Файлы завершившихся воркеров учитываются, чтобы счётчики не
+уменьшались, поэтому при запуске сервиса каталог очищается:
+clear_directory() вызывает хук on_starting из gunicorn.conf.py.
+
+Метрики отдаются только адресам из BLOG_METRICS_ALLOWED_IPS или по
+токену BLOG_METRICS_TOKEN.
+"""
+import glob
+import hmac
+import ipaddress
+import json
+import mmap
+import os
+import struct
+from collections import defaultdict
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, Iterator, Tuple
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Файл процесса: 8 байт заголовка (занятый размер), затем записи
+# «длина ключа, ключ с выравниванием до 8 байт, значение double»
+HEADER = struct.Struct('<Q')
+KEY_LENGTH = struct.Struct('<I')
+VALUE = struct.Struct('<d')
+INITIAL_FILE_SIZE = 64 * 1024
+
+
+def pad(length: int) -> int:
+    return length + (-length % 8)
+
+
+class MemoryStore:
+    def __init__(self):
+        self.values = defaultdict(float)
+        self.lock = Lock()
+
+    def inc(self, key: str, amount: float) -> None:
+        with self.lock:
+            self.values[key] += amount
+
+    def items(self) -> Iterator[Tuple[str, float]]:
+        with self.lock:
+            return iter(list(self.values.items()))
+
+
+class MmapStore:
+    """Значения одного процесса в файле, отображённом в память.
+
+    Пишет только сам процесс, поэтому блокировки между процессами
+    не нужны. Новая запись сначала заполняется, а уже потом
+    сдвигается занятый размер в заголовке: читатель не увидит
+    недописанную запись.
+    """
+
+    def __init__(self, path: str):
+        self.lock = Lock()
+        self.positions = {}
+        self.file = open(path, 'a+b')
+        if os.fstat(self.file.fileno()).st_size < INITIAL_FILE_SIZE:
+            self.file.truncate(INITIAL_FILE_SIZE)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.used = HEADER.unpack_from(self.map, 0)[0] or HEADER.size
+        for key, position in iter_entries(self.map, self.used):
+            self.positions[key] = position
+
+    def inc(self, key: str, amount: float) -> None:
+        with self.lock:
+            position = self.positions.get(key)
+            if position is None:
+                position = self.add(key)
+            value = VALUE.unpack_from(self.map, position)[0]
+            VALUE.pack_into(self.map, position, value + amount)
+
+    def add(self, key: str) -> int:
+        encoded = key.encode()
+        size = pad(KEY_LENGTH.size + len(encoded)) + VALUE.size
+        capacity = len(self.map)
+        if self.used + size > capacity:
+            self.map.close()
+            self.file.truncate(max(capacity * 2, self.used + size))
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        offset = self.used
+        KEY_LENGTH.pack_into(self.map, offset, len(encoded))
+        self.map[offset + KEY_LENGTH.size:
+                 offset + KEY_LENGTH.size + len(encoded)] = encoded
+        position = offset + size - VALUE.size
+        VALUE.pack_into(self.map, position, 0.0)
+        self.used += size
+        HEADER.pack_into(self.map, 0, self.used)
+        self.positions[key] = position
+        return position
+
+    def items(self) -> Iterator[Tuple[str, float]]:
+        with self.lock:
+            return iter([
+                (key, VALUE.unpack_from(self.map, position)[0])
+                for key, position in self.positions.items()
+            ])
+
+
+def iter_entries(data, used: int) -> Iterator[Tuple[str, int]]:
+    """Ключи файла процесса и смещения их значений."""
+    offset = HEADER.size
+    while offset < used:
+        length = KEY_LENGTH.unpack_from(data, offset)[0]
+        start = offset + KEY_LENGTH.size
+        key = bytes(data[start:start + length]).decode()
+        offset += pad(KEY_LENGTH.size + length) + VALUE.size
+        yield key, offset - VALUE.size
+
+
+def read_file(path: str) -> Iterator[Tuple[str, float]]:
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        return
+    for key, position in iter_entries(data, HEADER.unpack_from(data)[0]):
+        yield key, VALUE.unpack_from(data, position)[0]
+
+
+_store = None
+_store_pid = None
+
+
+def get_store():
+    """Хранилище текущего процесса; после fork заводится новое."""
+    global _store, _store_pid
+    pid = os.getpid()
+    if _store_pid != pid:
+        directory = settings.BLOG_METRICS_DIR
+        _store = (MmapStore(os.path.join(directory, f'metrics_{pid}.db'))
+                  if directory else MemoryStore())
+        _store_pid = pid
+    return _store
+
+
+def collect() -> Dict[str, float]:
+    """Значения всех процессов, сложенные по ключам."""
+    directory = settings.BLOG_METRICS_DIR
+    if not directory:
+        return dict(get_store().items())
+    get_store()
+    totals = defaultdict(float)
+    for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+        for key, value in read_file(path):
+            totals[key] += value
+    return totals
+
+
+def clear_directory(directory: str) -> None:
+    """Удаляет файлы процессов прошлого запуска сервиса."""
+    for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+        os.remove(path)
+
+
+def make_key(metric: str, sample: str, labels: dict) -> str:
+    return _make_key(metric, sample, tuple(sorted(labels.items())))
+
+
+@lru_cache(maxsize=4096)
+def _make_key(metric: str, sample: str, labels: tuple) -> str:
+    # Серий немного, а ключ строится на каждое измерение
+    return json.dumps([metric, sample, labels], ensure_ascii=False)
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        REGISTRY[name] = self
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        get_store().inc(make_key(self.name, self.name, labels), amount)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets):
+        super().__init__(name, documentation)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        store = get_store()
+        # Корзины храним без накопления, суммируем при выводе
+        le = next((bound for bound in self.buckets if value <= bound),
+                  float('inf'))
+        store.inc(make_key(self.name, f'{self.name}_bucket',
+                           {**labels, 'le': le}), 1)
+        store.inc(make_key(self.name, f'{self.name}_sum', labels), value)
+        store.inc(make_key(self.name, f'{self.name}_count', labels), 1)
+
+
+REGISTRY: Dict[str, Metric] = {}
+
+REQUESTS = Counter(
+    'blog_http_requests_total', 'Запросы по имени URL, методу и статусу.'
+)
+REQUEST_DURATION = Histogram(
+    'blog_http_request_duration_seconds', 'Время обработки запроса.',
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    'blog_db_queries_per_request', 'Число SQL-запросов на один запрос.',
+    (0, 1, 2, 5, 10, 20, 50, 100),
+)
+QUERY_DURATION = Histogram(
+    'blog_db_query_duration_seconds', 'Время одного SQL-запроса.',
+    (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1),
+)
+CACHE_REQUESTS = Counter(
+    'blog_cache_requests_total', 'Обращения к кэшам блога: hit или miss.'
+)
+UPLOAD_SIZE = Histogram(
+    'blog_upload_size_bytes', 'Размер загруженных изображений.',
+    (10_000, 100_000, 500_000, 1_000_000, 2_000_000, 5_000_000, 10_000_000),
+)
+POSTS_CREATED = Counter('blog_posts_created_total', 'Созданные посты.')
+COMMENTS_CREATED = Counter(
+    'blog_comments_created_total', 'Созданные комментарии.'
+)
+
+
+def record_cache(cache_name: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache_name, result='hit' if hit else 'miss')
+
+
+def format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+def escape_label(value) -> str:
+    return (str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def format_labels(labels) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(
+        f'{name}="{format_value(value)}"' if name == 'le'
+        else f'{name}="{escape_label(value)}"'
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+def render(values: Dict[str, float]) -> str:
+    samples = defaultdict(list)
+    for key, value in values.items():
+        metric, sample, labels = json.loads(key)
+        samples[metric].append(
+            (sample, [tuple(pair) for pair in labels], value)
+        )
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        if isinstance(metric, Histogram):
+            samples[name] = accumulate_buckets(metric, samples[name])
+        for sample, labels, value in sorted(samples[name],
+                                            key=sample_order):
+            lines.append(
+                f'{sample}{format_labels(labels)} {format_value(value)}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+def sample_order(sample):
+    name, labels, _ = sample
+    series = [pair for pair in labels if pair[0] != 'le']
+    le = dict(labels).get('le')
+    return series, name, le if le is not None else 0
+
+
+def accumulate_buckets(metric: Histogram, samples: list) -> list:
+    """Корзины Prometheus накопительные, и у каждой серии есть все корзины."""
+    buckets = defaultdict(float)
+    result = []
+    for sample, labels, value in samples:
+        if sample.endswith('_bucket'):
+            series = tuple(pair for pair in labels if pair[0] != 'le')
+            buckets[series, dict(labels)['le']] += value
+        else:
+            result.append((sample, labels, value))
+    for series in {series for series, _ in buckets}:
+        total = 0.0
+        for bound in (*metric.buckets, float('inf')):
+            total += buckets.get((series, bound), 0.0)
+            result.append((f'{metric.name}_bucket',
+                           [*series, ('le', bound)], total))
+    return result
+
+
+def is_allowed_client(request) -> bool:
+    token = settings.BLOG_METRICS_TOKEN
+    if token and hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    ):
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False)
+               for network in settings.BLOG_METRICS_ALLOWED_IPS)
+
+
+def metrics_view(request):
+    if not settings.BLOG_METRICS_ENABLED:
+        raise Http404
+    if not is_allowed_client(request):
+        raise PermissionDenied
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)
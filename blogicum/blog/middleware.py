@@ -0,0 +1,179 @@
+"""Лёгкие замеры запросов для продакшена и метрики для /metrics.
+
+Для доли запросов BLOG_TIMING_SAMPLE_RATE считаются общее время,
+время и число SQL-запросов, повторы одинаковых запросов и время
+рендеринга шаблона. Результат уходит в заголовок Server-Timing и
+в журнал blog.timing одной строкой JSON. Если одна и та же форма
+запроса повторилась больше BLOG_TIMING_N_PLUS_ONE раз, это похоже
+на N+1 — такие запросы попадают в журнал с уровнем WARNING.
+
+При нулевой доле middleware отключается целиком и ничего не стоит.
+"""
+import json
+import logging
+import random
+import re
+from collections import Counter
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger('blog.timing')
+
+# Прочие методы сводим в один, чтобы не плодить серии метрик
+KNOWN_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# Списки IN разной длины — одна и та же форма запроса
+IN_LIST_RE = re.compile(r'\bIN \((?:%s, )*%s\)')
+# Сколько символов SQL писать в журнал
+SQL_PREVIEW_LENGTH = 200
+
+
+def get_sql_shape(sql: str) -> str:
+    """Форма запроса: SQL с плейсхолдерами вместо значений."""
+    return IN_LIST_RE.sub('IN (...)', sql)
+
+
+class RequestTiming:
+    """Замеры одного запроса; собирает SQL через execute_wrapper."""
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.total = self.db = self.template = 0.0
+        self.queries = self.duplicates = 0
+        self.shapes = Counter()
+        self.seen = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += perf_counter() - started
+            self.queries += 1
+            self.shapes[get_sql_shape(sql)] += 1
+            # Параметры бывают списками, поэтому сравниваем по repr
+            key = (sql, repr(params))
+            if key in self.seen:
+                self.duplicates += 1
+            else:
+                self.seen.add(key)
+
+    def get_repeated(self, threshold: int) -> list:
+        return [
+            {'sql': shape[:SQL_PREVIEW_LENGTH], 'count': count}
+            for shape, count in self.shapes.most_common()
+            if count > threshold
+        ]
+
+    def get_server_timing(self) -> str:
+        return (
+            f'total;dur={self.total * 1000:.1f}, '
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries,'
+            f' {self.duplicates} duplicates", '
+            f'tpl;dur={self.template * 1000:.1f}'
+        )
+
+
+class RequestTimingMiddleware:
+    def __init__(self, get_response):
+        self.sample_rate = settings.BLOG_TIMING_SAMPLE_RATE
+        if not self.sample_rate:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.n_plus_one = settings.BLOG_TIMING_N_PLUS_ONE
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        timing = request._timing = RequestTiming()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing))
+            response = self.get_response(request)
+        timing.total = perf_counter() - timing.started
+        if settings.BLOG_TIMING_HEADER:
+            response['Server-Timing'] = timing.get_server_timing()
+        self.log(request, response, timing)
+        return response
+
+    def process_template_response(self, request, response):
+        """Шаблон рендерится сразу после этого вызова — засекаем время."""
+        timing = getattr(request, '_timing', None)
+        if timing is not None:
+            started = perf_counter()
+
+            def stop(response):
+                timing.template += perf_counter() - started
+
+            response.add_post_render_callback(stop)
+        return response
+
+    def log(self, request, response, timing):
+        match = request.resolver_match
+        repeated = timing.get_repeated(self.n_plus_one)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(timing.total * 1000, 2),
+            'db_ms': round(timing.db * 1000, 2),
+            'template_ms': round(timing.template * 1000, 2),
+            'queries': timing.queries,
+            'duplicates': timing.duplicates,
+        }
+        if repeated:
+            record['n_plus_one'] = repeated
+        logger.log(logging.WARNING if repeated else logging.INFO,
+                   json.dumps(record, ensure_ascii=False),
+                   extra={'timing': record})
+
+
+class QueryMetrics:
+    """Считает SQL-запросы и записывает время каждого в гистограмму."""
+
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            metrics.QUERY_DURATION.observe(perf_counter() - started)
+            self.queries += 1
+
+
+class MetricsMiddleware:
+    """Число, время и SQL-запросы HTTP-запросов по имени URL."""
+
+    def __init__(self, get_response):
+        if not settings.BLOG_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryMetrics()
+        started = perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        duration = perf_counter() - started
+        match = request.resolver_match
+        # Несовпавшие адреса не дробим по пути: их бесконечно много
+        view = match.view_name if match else 'unmatched'
+        method = request.method if request.method in KNOWN_METHODS else (
+            'other'
+        )
+        metrics.REQUESTS.inc(view=view, method=method,
+                             status=response.status_code)
+        metrics.REQUEST_DURATION.observe(duration, view=view)
+        metrics.REQUEST_QUERIES.observe(queries.queries, view=view)
+        return response
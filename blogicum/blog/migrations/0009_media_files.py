@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:04
+
+import blog.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_image_refs(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    MediaFile = apps.get_model('blog', 'MediaFile')
+    refs = (Post.objects.exclude(image='').values('image')
+            .annotate(ref_count=Count('pk')).order_by())
+    MediaFile.objects.bulk_create(
+        MediaFile(name=row['image'], ref_count=row['ref_count'])
+        for row in refs
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_image_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Файл')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='Ссылок')),
+            ],
+            options={
+                'verbose_name': 'файл',
+                'verbose_name_plural': 'Файлы',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=blog.storage.ContentAddressedStorage(), upload_to='posts_images', verbose_name='Изображение к посту'),
+        ),
+        migrations.RunPython(count_image_refs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:40
+
+from django.db import migrations
+
+from blog import search
+
+
+def create_search_index(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    search.create_index(schema_editor)
+    posts = Post.objects.using(schema_editor.connection.alias).only(
+        'title', 'text'
+    )
+    search.index_posts(posts.iterator(),
+                       using=schema_editor.connection.alias)
+
+
+def drop_search_index(apps, schema_editor):
+    search.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_media_files'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def fill_user_stats(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    UserStats = apps.get_model('blog', 'UserStats')
+    stats = {}
+    for row in Post.objects.values('author').annotate(
+        n=Count('pk', filter=Q(is_published=True)), last=Max('created_at')
+    ).order_by():
+        stats[row['author']] = UserStats(
+            user_id=row['author'], post_count=row['n'],
+            last_activity=row['last'],
+        )
+    for row in Comment.objects.values('author').annotate(
+        n=Count('pk'), last=Max('created_at')
+    ).order_by():
+        item = stats.setdefault(row['author'],
+                                UserStats(user_id=row['author']))
+        item.comment_count = row['n']
+        if item.last_activity is None or row['last'] > item.last_activity:
+            item.last_activity = row['last']
+    UserStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('blog', '0010_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='blog_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Опубликованных постов')),
+                ('comment_count', models.PositiveIntegerField(default=0, verbose_name='Комментариев')),
+                ('last_activity', models.DateTimeField(blank=True, null=True, verbose_name='Последняя активность')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Изменено')),
+            ],
+            options={
+                'verbose_name': 'статистика пользователя',
+                'verbose_name_plural': 'Статистика пользователей',
+            },
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
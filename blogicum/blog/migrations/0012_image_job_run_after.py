@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_user_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagejob',
+            name='run_after',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Повторить после'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import post_image_storage
+
 
 User = get_user_model()
 
@@ -17,6 +19,10 @@ class BaseModel(models.Model):
         auto_now_add=True,
         verbose_name='Добавлено'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено'
+    )
 
     class Meta:
         abstract = True
@@ -57,11 +63,40 @@ class Post(BaseModel):
     )
     image = models.ImageField('Изображение к посту',
                               upload_to='posts_images',
+                              storage=post_image_storage,
                               blank=True)
+    image_ready = models.BooleanField(
+        default=True,
+        editable=False,
+        verbose_name='Изображение обработано',
+        help_text='Пока загруженное изображение обрабатывается, '
+                  'вместо него показывается заглушка.'
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев',
+        help_text='Обновляется автоматически при добавлении '
+                  'и удалении комментариев.'
+    )
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
+        # Индексы повторяют фильтры и сортировку лент постов.
+        # is_published вынесен в условие частичного индекса: булево поле
+        # попадает в WHERE без сравнения, и как префикс индекса
+        # оно не помогает искать по диапазону pub_date.
+        indexes = [
+            models.Index(fields=['pub_date'],
+                         condition=models.Q(is_published=True),
+                         name='post_published_pub_date_idx'),
+            models.Index(fields=['category', 'pub_date'],
+                         condition=models.Q(is_published=True),
+                         name='post_category_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -129,6 +164,115 @@ class Comment(models.Model):
     class Meta:
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created_at'],
+                         name='comment_post_created_at_idx'),
+        ]
 
     def __str__(self):
         return self.text
+
+
+class ImageJob(models.Model):
+    """Задание фоновой обработки изображения поста."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Готово'
+        FAILED = 'failed', 'Ошибка'
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='image_jobs'
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Добавлено'
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Начато'
+    )
+    run_after = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Повторить после'
+    )
+
+    class Meta:
+        verbose_name = 'обработка изображения'
+        verbose_name_plural = 'Обработка изображений'
+        indexes = [
+            models.Index(fields=['status', 'created_at'],
+                         name='imagejob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.get_status_display()}'
+
+
+class MediaFile(models.Model):
+    """Счётчик ссылок постов на файл в общем хранилище изображений."""
+
+    name = models.CharField(max_length=255, unique=True,
+                            verbose_name='Файл')
+    ref_count = models.PositiveIntegerField(default=0,
+                                            verbose_name='Ссылок')
+
+    class Meta:
+        verbose_name = 'файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self):
+        return f'{self.name} ({self.ref_count})'
+
+
+class UserStats(models.Model):
+    """Счётчики для шапки профиля, пересчитываются сигналами."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь',
+        related_name='blog_stats'
+    )
+    post_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Опубликованных постов'
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Комментариев'
+    )
+    last_activity = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Последняя активность'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено'
+    )
+
+    class Meta:
+        verbose_name = 'статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return str(self.user_id)
@@ -0,0 +1,238 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, InvalidPage, Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .metrics import record_cache
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(post) -> str:
+    """Непрозрачный токен позиции поста в ленте."""
+    raw = f'{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str) -> Tuple[datetime, int]:
+    """Разбор токена обратно в пару (pub_date, id)."""
+    try:
+        raw = base64.urlsafe_b64decode(
+            token + '=' * (-len(token) % 4)
+        ).decode()
+        pub_date, pk = raw.rsplit('|', 1)
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor('Некорректный курсор.')
+    if pub_date is None:
+        raise InvalidCursor('Некорректный курсор.')
+    return pub_date, pk
+
+
+class WindowedPage(Page):
+
+    @cached_property
+    def page_window(self):
+        """Номера страниц вокруг текущей: 1 … 4 5 6 [7] 8 9 10 … 50.
+
+        Шаблон выводит не больше 2 * (on_each_side + on_ends) + 3 ссылок,
+        сколько бы страниц ни было в ленте.
+        """
+        return list(self.paginator.get_elided_page_range(
+            self.number,
+            on_each_side=self.paginator.on_each_side,
+            on_ends=self.paginator.on_ends,
+        ))
+
+    def has_next(self):
+        # За приблизительным концом ленты посты ещё есть
+        return super().has_next() or (
+            self.paginator.is_approximate
+            and self.number == self.paginator.num_pages
+        )
+
+
+class WindowedPaginator(Paginator):
+    """Пагинатор с кэшируемым и, по желанию, приблизительным числом строк.
+
+    count_key — ключ кэша, под которым хранится число объектов; ключ
+    должен меняться вместе с содержимым ленты (см. get_feed_key).
+    Если задан approximate_after, COUNT(*) не идёт дальше этого числа:
+    страниц считается не больше, а последняя ссылка ведёт «дальше».
+    """
+
+    on_each_side = 3
+    on_ends = 1
+
+    def __init__(self, *args, count_key=None, count_timeout=None,
+                 approximate_after=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+        self.count_timeout = count_timeout
+        self.approximate_after = approximate_after
+        self.is_approximate = False
+
+    @cached_property
+    def count(self):
+        cached = cache.get(self.count_key) if self.count_key else None
+        if self.count_key:
+            record_cache('feed_count', cached is not None)
+        if cached is None:
+            cached = self.get_count()
+            if self.count_key:
+                cache.set(self.count_key, cached, self.count_timeout)
+        count, self.is_approximate = cached
+        return count
+
+    def get_count(self) -> Tuple[int, bool]:
+        """Пара (число объектов, приблизительное ли оно)."""
+        if self.approximate_after is None:
+            # Точный подсчёт базового Paginator, минуя его кэш в __dict__
+            return Paginator.count.func(self), False
+        # COUNT(*) по подзапросу с LIMIT не просматривает всю ленту
+        count = self.object_list[:self.approximate_after + 1].count()
+        if count > self.approximate_after:
+            return self.approximate_after, True
+        return count, False
+
+    @property
+    def last_page_number(self):
+        """Номер для ссылки «Последняя» или None, если ссылки нет."""
+        return None if self.is_approximate else self.num_pages
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
+
+
+class FeedPaginator(WindowedPaginator):
+    """Постраничная разбивка по номеру для первых страниц ленты.
+
+    Номера дальше `offset_pages` не принимаются и не выводятся, а со
+    страницы `offset_pages` ссылка «дальше» ведёт на курсор: глубокие
+    страницы никогда не требуют OFFSET.
+    """
+
+    def __init__(self, *args, offset_pages=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.offset_pages = offset_pages
+
+    def is_capped(self):
+        return (self.offset_pages is not None
+                and self.num_pages > self.offset_pages)
+
+    def validate_number(self, number):
+        number = super().validate_number(number)
+        if self.offset_pages is not None and number > self.offset_pages:
+            raise EmptyPage('Дальние страницы доступны только по курсору.')
+        return number
+
+    def get_elided_page_range(self, number=1, **kwargs):
+        if not self.is_capped():
+            return super().get_elided_page_range(number, **kwargs)
+        # Окно строится так, будто страниц в ленте ровно offset_pages
+        return Paginator(
+            range(self.offset_pages), 1
+        ).get_elided_page_range(number, **kwargs)
+
+    @property
+    def last_page_number(self):
+        if self.is_capped():
+            return None
+        return super().last_page_number
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        page.is_keyset = False
+        page.previous_cursor = None
+        page.next_cursor = None
+        if (self.offset_pages is not None
+                and page.number >= self.offset_pages
+                and page.has_next()):
+            page.next_cursor = encode_cursor(page[-1])
+        return page
+
+
+class KeysetPage:
+    """Страница ленты, выбранная по курсору, а не по смещению."""
+
+    is_keyset = True
+    number = None
+
+    def __init__(self, object_list, paginator, has_previous, has_next):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self.previous_cursor = (
+            encode_cursor(object_list[0])
+            if has_previous and object_list else None
+        )
+        self.next_cursor = (
+            encode_cursor(object_list[-1])
+            if has_next and object_list else None
+        )
+
+    def __repr__(self):
+        return '<Page after cursor>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+
+class KeysetPaginator:
+    """Курсорная пагинация по паре (pub_date, id) в порядке убывания.
+
+    Страница выбирается условием на индексируемые колонки и LIMIT,
+    поэтому стоимость не зависит от глубины и не требует COUNT(*).
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset.order_by('-pub_date', '-pk')
+        self.per_page = int(per_page)
+
+    def page(self, after=None, before=None):
+        if after:
+            pub_date, pk = decode_cursor(after)
+            object_list = list(self.queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            )[:self.per_page + 1])
+            has_next = len(object_list) > self.per_page
+            return KeysetPage(object_list[:self.per_page], self,
+                              has_previous=True, has_next=has_next)
+        if before:
+            pub_date, pk = decode_cursor(before)
+            object_list = list(self.queryset.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+            ).reverse()[:self.per_page + 1])
+            has_previous = len(object_list) > self.per_page
+            object_list = object_list[:self.per_page][::-1]
+            return KeysetPage(object_list, self,
+                              has_previous=has_previous, has_next=True)
+        object_list = list(self.queryset[:self.per_page + 1])
+        has_next = len(object_list) > self.per_page
+        return KeysetPage(object_list[:self.per_page], self,
+                          has_previous=False, has_next=has_next)
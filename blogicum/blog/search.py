@@ -0,0 +1,150 @@
+"""Полнотекстовый поиск по постам.
+
+Индекс живёт в отдельной таблице blog_post_search: в SQLite это
+виртуальная таблица FTS5, в PostgreSQL — таблица с tsvector и GIN-индексом.
+Для SQLite слова приводятся к основам здесь же (стеммер Snowball),
+PostgreSQL делает это сам конфигурацией 'russian'.
+"""
+import re
+from functools import lru_cache
+from typing import Iterable, List
+
+import snowballstemmer
+from django.db import connection, connections
+from django.db.models import Q, QuerySet
+
+SEARCH_TABLE = 'blog_post_search'
+# Совпадение в заголовке весит больше, чем в тексте
+TITLE_WEIGHT, TEXT_WEIGHT = 10.0, 1.0
+
+WORD_RE = re.compile(r'\w+')
+_stemmer = snowballstemmer.stemmer('russian')
+# Стемминг — самая дорогая часть индексации, а словарь блога невелик
+_stem = lru_cache(maxsize=100_000)(_stemmer.stemWord)
+
+
+def get_stems(text: str) -> List[str]:
+    """Основы слов: «Публикации» и «публикация» дают одно и то же."""
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [_stem(word) for word in words]
+
+
+def is_supported(vendor: str = None) -> bool:
+    return (vendor or connection.vendor) in ('sqlite', 'postgresql')
+
+
+def create_index(schema_editor) -> None:
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5('
+            "title, text, tokenize='unicode61 remove_diacritics 2')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE TABLE {SEARCH_TABLE} ('
+            'post_id bigint PRIMARY KEY REFERENCES blog_post (id)'
+            ' ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,'
+            ' document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {SEARCH_TABLE}_document_idx'
+            f' ON {SEARCH_TABLE} USING gin (document)'
+        )
+
+
+def drop_index(schema_editor) -> None:
+    if is_supported(schema_editor.connection.vendor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def index_posts(posts: Iterable, using: str = 'default') -> int:
+    """Добавляет посты в индекс или обновляет их записи."""
+    conn = connections[using]
+    if not is_supported(conn.vendor):
+        return 0
+    rows = [(post.pk, post.title, post.text) for post in posts]
+    if not rows:
+        return 0
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.executemany(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                [(pk,) for pk, _, _ in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, title, text)'
+                ' VALUES (%s, %s, %s)',
+                [(pk, ' '.join(get_stems(title)), ' '.join(get_stems(text)))
+                 for pk, title, text in rows],
+            )
+        else:
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (post_id, document) VALUES'
+                " (%s, setweight(to_tsvector('russian', %s), 'A')"
+                " || setweight(to_tsvector('russian', %s), 'B'))"
+                ' ON CONFLICT (post_id) DO UPDATE'
+                ' SET document = EXCLUDED.document',
+                rows,
+            )
+    return len(rows)
+
+
+def remove_post(post_id: int, using: str = 'default') -> None:
+    conn = connections[using]
+    if not is_supported(conn.vendor):
+        return
+    column = 'rowid' if conn.vendor == 'sqlite' else 'post_id'
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE {column} = %s', [post_id]
+        )
+
+
+def clear_index() -> None:
+    if is_supported():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+
+def search_posts(queryset: QuerySet, query: str) -> QuerySet:
+    """Посты из queryset, подходящие под запрос, от самых релевантных.
+
+    Видимость постов задаёт сам queryset (см. get_filtered_posts):
+    индекс хранит все посты, а фильтруются они при поиске. Таблица
+    индекса присоединяется к постам один раз, и оценка берётся из той
+    же строки, а не подзапросом на каждый пост.
+    """
+    stems = get_stems(query)
+    if not stems:
+        return queryset.none()
+    vendor = connections[queryset.db].vendor
+    post_id = f'{queryset.model._meta.db_table}.id'
+    if vendor == 'sqlite':
+        match = ' '.join(f'"{stem}"' for stem in stems)
+        # bm25 тем меньше, чем документ релевантнее
+        queryset = queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[f'{SEARCH_TABLE}.rowid = {post_id}',
+                   f'{SEARCH_TABLE} MATCH %s'],
+            params=[match],
+            select={'rank': f'-bm25({SEARCH_TABLE}, {TITLE_WEIGHT},'
+                            f' {TEXT_WEIGHT})'},
+        )
+    elif vendor == 'postgresql':
+        tsquery = "websearch_to_tsquery('russian', %s)"
+        queryset = queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[f'{SEARCH_TABLE}.post_id = {post_id}',
+                   f'{SEARCH_TABLE}.document @@ {tsquery}'],
+            params=[query],
+            select={'rank': f'ts_rank({SEARCH_TABLE}.document, {tsquery})'},
+            select_params=[query],
+        )
+    else:
+        # Запасной вариант без индекса для прочих СУБД
+        conditions = Q()
+        for word in WORD_RE.findall(query):
+            conditions &= Q(title__icontains=word) | Q(text__icontains=word)
+        return queryset.filter(conditions)
+    return queryset.order_by('-rank', '-pub_date', '-pk')
@@ -0,0 +1,234 @@
+"""Синтетические данные для оценки нагрузки.
+
+Число постов у автора и комментариев у поста подчиняется степенному
+закону: немногие авторы пишут большую часть постов, немногие посты
+собирают большую часть комментариев. Один и тот же seed даёт одно и то
+же содержимое; даты отсчитываются от момента запуска.
+"""
+import random
+from array import array
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, islice
+from typing import Iterable, Iterator, List
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+
+from .bulk import DEFAULT_BATCH_SIZE, refresh_imported_posts
+from .models import Category, Comment, Location, Post
+
+# Пароль всех созданных пользователей — для входа в нагрузочных тестах
+SEED_PASSWORD = 'seed-password'
+# Насколько давно начался блог
+HISTORY = timedelta(days=365 * 3)
+# Как далеко вперёд запланированы отложенные посты
+SCHEDULE_AHEAD = timedelta(days=30)
+
+WORDS = (
+    'день', 'утро', 'вечер', 'город', 'дорога', 'море', 'лес', 'книга',
+    'кофе', 'друг', 'работа', 'отпуск', 'поезд', 'дождь', 'солнце',
+    'история', 'новость', 'прогулка', 'музыка', 'кино', 'спорт', 'кошка',
+    'собака', 'сад', 'дом', 'окно', 'письмо', 'встреча', 'праздник',
+    'зима', 'весна', 'лето', 'осень', 'горы', 'река', 'парк', 'выставка',
+    'рецепт', 'ужин', 'завтрак', 'поход', 'фотография', 'велосипед',
+    'наблюдение', 'мысль', 'план', 'мечта', 'привычка', 'здоровье',
+    'новый', 'старый', 'тихий', 'быстрый', 'долгий', 'первый',
+    'последний', 'обычный', 'странный', 'весёлый', 'спокойный',
+    'увидел', 'написал', 'узнал', 'решил', 'нашёл', 'вспомнил',
+)
+
+
+def get_cum_weights(ranks: Iterable[int], exponent: float) -> array:
+    """Накопленные веса закона Ципфа: вес ранга r равен 1 / r^exponent.
+
+    Ранг 0 означает, что объект не выбирается.
+    """
+    return array('d', accumulate(
+        rank ** -exponent if rank else 0.0 for rank in ranks
+    ))
+
+
+def get_shuffled_ranks(rng: random.Random, count: int) -> List[int]:
+    ranks = list(range(1, count + 1))
+    rng.shuffle(ranks)
+    return ranks
+
+
+def iter_chunks(objects: Iterable, size: int) -> Iterator[list]:
+    objects = iter(objects)
+    while True:
+        chunk = list(islice(objects, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+class Seeder:
+    """Создаёт объекты порциями через bulk_create.
+
+    Первичные ключи созданных объектов хранятся в компактных массивах:
+    по ним строятся связи следующих моделей.
+    """
+
+    def __init__(self, seed: int = 0, batch_size: int = DEFAULT_BATCH_SIZE,
+                 exponent: float = 1.1, now: datetime = None):
+        self.rng = random.Random(seed)
+        self.prefix = f'seed{seed}'
+        self.batch_size = batch_size
+        self.exponent = exponent
+        self.now = (now or datetime.now(timezone.utc)).timestamp()
+        self.users = array('q')
+        self.categories = array('q')
+        self.locations = array('q')
+        self.posts = array('q')
+        # Для комментариев: дата публикации поста и ранг его популярности
+        self.post_dates = array('d')
+        self.post_ranks = array('q')
+
+    def words(self, low: int, high: int) -> str:
+        return ' '.join(self.rng.choices(WORDS, k=self.rng.randint(low,
+                                                                   high)))
+
+    def past(self, period: timedelta) -> float:
+        return self.now - self.rng.random() * period.total_seconds()
+
+    def insert(self, model, objects: Iterable) -> array:
+        """Сохраняет объекты и возвращает их первичные ключи по порядку.
+
+        Ключи дочитываются после каждой порции по условию pk > последнего:
+        bulk_create возвращает их не на всех СУБД.
+        """
+        manager = model._default_manager
+        last = manager.aggregate(last=Max('pk'))['last'] or 0
+        pks = array('q')
+        for chunk in iter_chunks(objects, self.batch_size):
+            with transaction.atomic():
+                manager.bulk_create(chunk)
+                new_pks = list(manager.filter(pk__gt=last).order_by(
+                    'pk').values_list('pk', flat=True))
+                if model is Post:
+                    refresh_imported_posts(new_pks)
+            pks.extend(new_pks)
+            last = new_pks[-1]
+        return pks
+
+    def create_users(self, count: int) -> int:
+        password = make_password(SEED_PASSWORD)  # Хешируем один раз
+        self.users = self.insert(get_user_model(), (
+            get_user_model()(
+                username=f'{self.prefix}_user{number}',
+                email=f'{self.prefix}_user{number}@example.com',
+                first_name=self.words(1, 1).capitalize(),
+                password=password,
+                date_joined=to_datetime(self.past(HISTORY)),
+            ) for number in range(count)
+        ))
+        return count
+
+    def create_categories(self, count: int) -> int:
+        self.categories = self.insert(Category, (
+            Category(
+                title=self.words(1, 3).capitalize(),
+                description=self.words(10, 30),
+                slug=f'{self.prefix}-{number}',
+                is_published=self.rng.random() > 0.1,
+                created_at=to_datetime(self.past(HISTORY)),
+                updated_at=to_datetime(self.now),
+            ) for number in range(count)
+        ))
+        return count
+
+    def create_locations(self, count: int) -> int:
+        self.locations = self.insert(Location, (
+            Location(
+                name=f'{self.words(1, 2).capitalize()} {number}',
+                is_published=self.rng.random() > 0.1,
+                created_at=to_datetime(self.past(HISTORY)),
+                updated_at=to_datetime(self.now),
+            ) for number in range(count)
+        ))
+        return count
+
+    def create_posts(self, count: int, scheduled: float = 0.05,
+                     unpublished: float = 0.05) -> int:
+        """Посты; доли отложенных и снятых с публикации задаются отдельно."""
+        authors = get_cum_weights(range(1, len(self.users) + 1),
+                                  self.exponent)
+        categories = get_cum_weights(range(1, len(self.categories) + 1),
+                                     self.exponent)
+        # Популярность поста не зависит от его возраста
+        ranks = get_shuffled_ranks(self.rng, count)
+        self.posts = self.insert(
+            Post, self.generate_posts(count, authors, categories, ranks,
+                                      scheduled, unpublished)
+        )
+        return count
+
+    def generate_posts(self, count, authors, categories, ranks,
+                       scheduled, unpublished) -> Iterator[Post]:
+        rng = self.rng
+        for number in range(count):
+            is_published = rng.random() >= unpublished
+            if rng.random() < scheduled:
+                pub_date = self.now + rng.random() * (
+                    SCHEDULE_AHEAD.total_seconds()
+                )
+                created_at = self.past(timedelta(days=1))
+            else:
+                pub_date = self.past(HISTORY)
+                created_at = pub_date - rng.random() * 3600
+            visible = is_published and pub_date <= self.now
+            self.post_dates.append(pub_date)
+            # Скрытые посты не комментируют
+            self.post_ranks.append(ranks[number] if visible else 0)
+            yield Post(
+                title=self.words(2, 7).capitalize(),
+                text=self.words(20, 120).capitalize() + '.',
+                pub_date=to_datetime(pub_date),
+                author_id=self.users[rng.choices(
+                    range(len(self.users)), cum_weights=authors)[0]],
+                category_id=self.categories[rng.choices(
+                    range(len(self.categories)), cum_weights=categories)[0]],
+                location_id=(rng.choice(self.locations)
+                             if self.locations and rng.random() < 0.7
+                             else None),
+                is_published=is_published,
+                created_at=to_datetime(created_at),
+                updated_at=to_datetime(created_at),
+            )
+
+    def create_comments(self, count: int) -> int:
+        """Комментарии к опубликованным постам, после даты публикации."""
+        if not any(self.post_ranks):
+            return 0
+        posts = get_cum_weights(self.post_ranks, self.exponent)
+        # Активные комментаторы — не обязательно активные авторы
+        commenters = get_cum_weights(
+            get_shuffled_ranks(self.rng, len(self.users)), self.exponent
+        )
+        self.insert(Comment, self.generate_comments(count, posts, commenters))
+        return count
+
+    def generate_comments(self, count, posts, commenters
+                          ) -> Iterator[Comment]:
+        rng = self.rng
+        post_indexes = range(len(self.posts))
+        user_indexes = range(len(self.users))
+        for _ in range(count):
+            index = rng.choices(post_indexes, cum_weights=posts)[0]
+            pub_date = self.post_dates[index]
+            # Большая часть комментариев приходит вскоре после публикации
+            created_at = pub_date + (self.now - pub_date) * rng.random() ** 4
+            yield Comment(
+                text=self.words(3, 40).capitalize(),
+                post_id=self.posts[index],
+                author_id=self.users[rng.choices(
+                    user_indexes, cum_weights=commenters)[0]],
+                created_at=to_datetime(created_at),
+            )
@@ -0,0 +1,313 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.db.models.functions import Greatest
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import (bump_comments_version, bump_feed_version,
+                    get_category_key, get_location_key, get_post_card_key,
+                    invalidate_lookups, invalidate_post_cards, purge_tags)
+from .jobs import enqueue_image_job
+from .media import release_file, retain_file
+from .metrics import COMMENTS_CREATED, POSTS_CREATED
+from .models import Category, Comment, Location, Post
+from .search import index_posts, remove_post
+from .stats import schedule_stats_refresh
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """Увеличиваем счётчик комментариев поста.
+
+    Время изменения поста сдвигается и при правке комментария:
+    по нему строятся ETag и Last-Modified страницы поста.
+    """
+    changes = {'updated_at': timezone.now()}
+    if created:
+        changes['comment_count'] = F('comment_count') + 1
+    Post.objects.filter(pk=instance.post_id).update(**changes)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    """Уменьшаем счётчик комментариев поста.
+
+    Срабатывает и при удалении через админку или QuerySet.delete().
+    """
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=Greatest(F('comment_count') - 1, 0),
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_feed_cache(sender, **kwargs):
+    """Сбрасываем закэшированные страницы ленты.
+
+    Повторный сброс после коммита не даёт параллельному запросу
+    закэшировать ленту, прочитанную до фиксации транзакции.
+    """
+    bump_feed_version()
+    transaction.on_commit(bump_feed_version)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_feed_lists(sender, **kwargs):
+    """Комментарий меняет только счётчик в карточке одного поста.
+
+    Число постов, отложенные публикации и справочники остаются
+    в кэше; заново читаются лишь списки постов страниц ленты.
+    Карточка поста сменит ключ сама: в нём есть число комментариев.
+    """
+    bump_comments_version()
+    transaction.on_commit(bump_comments_version)
+
+
+@receiver(post_init, sender=get_user_model())
+def remember_loaded_username(sender, instance, **kwargs):
+    # Имя, с которым объект создан или загружен из базы; у отложенного
+    # через only() поля его нет
+    instance._loaded_username = instance.__dict__.get('username')
+
+
+@receiver(pre_save, sender=get_user_model())
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    """Прежнее имя нужно, только если сохранение может его поменять.
+
+    Вход обновляет лишь last_login, а у загруженного объекта прежнее
+    имя уже известно: в обоих случаях лишнего SELECT не будет.
+    """
+    if instance._state.adding or (
+        update_fields is not None and 'username' not in update_fields
+    ):
+        instance._old_username = None
+    elif getattr(instance, '_loaded_username', None) is not None:
+        instance._old_username = instance._loaded_username
+    else:
+        instance._old_username = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list('username', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_author_pages(sender, instance, created, update_fields=None,
+                            **kwargs):
+    """Имя автора видно в лентах и на страницах постов.
+
+    Сброс версии ленты меняет и ETag страниц, иначе клиенты получали бы
+    304 со старым именем.
+    """
+    old_username = getattr(instance, '_old_username', None)
+    if update_fields is None or 'username' in update_fields:
+        # Теперь в базе то имя, что у объекта
+        instance._loaded_username = instance.username
+    if created or old_username in (None, instance.username):
+        return
+    invalidate_feed_cache(sender)
+    purge_pages('blog')
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_slug(sender, instance, **kwargs):
+    instance._old_slug = None if instance._state.adding else (
+        Category.objects.filter(pk=instance.pk)
+        .values_list('slug', flat=True).first()
+    )
+
+
+def drop_lookups(*keys):
+    """Сбрасываем сразу и ещё раз после коммита, как и ленту."""
+    invalidate_lookups(*keys)
+    transaction.on_commit(lambda: invalidate_lookups(*keys))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_lookup(sender, instance, **kwargs):
+    slugs = {instance.slug, getattr(instance, '_old_slug', None)}
+    drop_lookups(*(get_category_key(slug) for slug in slugs if slug))
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location_lookup(sender, instance, **kwargs):
+    drop_lookups(get_location_key(instance.pk))
+
+
+@receiver(post_delete, sender=Post)
+def delete_post_card(sender, instance, **kwargs):
+    cache.delete(get_post_card_key(
+        instance.pk, instance.updated_at, instance.comment_count,
+        instance.author.username
+    ))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(pre_delete, sender=Location)
+def delete_related_post_cards(sender, instance, **kwargs):
+    """Карточки показывают категорию и локацию — сбрасываем их.
+
+    При удалении карточки собираются до того, как у постов
+    обнулится ссылка на категорию или локацию.
+    """
+    invalidate_post_cards(instance.posts.all())
+
+
+def purge_pages(*tags):
+    """Сбрасываем теги сразу и ещё раз после коммита транзакции."""
+    purge_tags(*tags)
+    transaction.on_commit(lambda: purge_tags(*tags))
+
+
+def get_post_page_tags(post_id):
+    """Теги страниц, на которых виден пост."""
+    values = Post.objects.filter(pk=post_id).values(
+        'author__username', 'category__slug'
+    ).first()
+    if values is None:
+        return {f'post:{post_id}', 'index'}
+    return {
+        f'post:{post_id}',
+        'index',
+        f'profile:{values["author__username"]}',
+        f'category:{values["category__slug"]}',
+    }
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_delete, sender=Post)
+def remember_post_page_tags(sender, instance, **kwargs):
+    """Запоминаем теги до изменения: пост мог сменить категорию."""
+    instance._page_tags = (
+        get_post_page_tags(instance.pk) if instance.pk else set()
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    purge_pages(
+        *getattr(instance, '_page_tags', set()),
+        *get_post_page_tags(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    """Комментарий меняет страницу поста и счётчик в лентах с ним."""
+    purge_pages(*get_post_page_tags(instance.post_id))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def purge_all_pages(sender, instance, **kwargs):
+    """Категории и локации видны в карточках на любых страницах."""
+    purge_pages('blog')
+
+
+@receiver(pre_save, sender=Post)
+def mark_uploaded_image(sender, instance, **kwargs):
+    """Новый файл ещё не записан в хранилище — значит, его только загрузили.
+
+    До обработки фоновым обработчиком пост показывает заглушку.
+    """
+    instance._image_uploaded = bool(
+        instance.image and not instance.image._committed
+    )
+    if instance._image_uploaded:
+        instance.image_ready = False
+        # Ссылку на файл возьмёт хранилище при записи
+        instance._image_retained = True
+
+
+@receiver(post_save, sender=Post)
+def enqueue_image_processing(sender, instance, **kwargs):
+    if getattr(instance, '_image_uploaded', False):
+        enqueue_image_job(instance)
+
+
+@receiver(pre_save, sender=Post)
+def remember_image_name(sender, instance, update_fields=None, **kwargs):
+    """Запоминаем прежний файл, чтобы после сохранения поправить счётчики."""
+    if update_fields is not None and 'image' not in update_fields:
+        instance._old_image = None
+    elif instance._state.adding:
+        instance._old_image = ''
+    else:
+        instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('image', flat=True).first() or ''
+
+
+@receiver(post_save, sender=Post)
+def update_image_refs(sender, instance, **kwargs):
+    retained = instance.__dict__.pop('_image_retained', False)
+    old, new = getattr(instance, '_old_image', None), instance.image.name
+    if old is None:
+        return
+    if old == (new or ''):
+        if retained and new:
+            # Загрузили тот же файл: лишняя ссылка от хранилища не нужна
+            release_file(new)
+        return
+    if new and not retained:
+        retain_file(new)
+    if old:
+        release_file(old)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_image(sender, instance, **kwargs):
+    if instance.image:
+        release_file(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, update_fields=None,
+                        using='default', **kwargs):
+    if update_fields is None or {'title', 'text'} & set(update_fields):
+        index_posts([instance], using=using)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_index(sender, instance, using='default', **kwargs):
+    remove_post(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def update_author_stats(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'is_published' in update_fields:
+        schedule_stats_refresh(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def update_commenter_stats(sender, instance, created=True, **kwargs):
+    # Правка текста комментария счётчики не меняет
+    if created:
+        schedule_stats_refresh(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        counter = POSTS_CREATED if sender is Post else COMMENTS_CREATED
+        transaction.on_commit(counter.inc)
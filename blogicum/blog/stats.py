@@ -0,0 +1,115 @@
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import purge_tags
+from .models import Comment, Post, UserStats
+
+
+def get_user_stats(user) -> UserStats:
+    """Статистика пользователя; у тех, кто ничего не писал, строки нет."""
+    try:
+        return user.blog_stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
+
+
+def calculate_user_stats(user_id: int) -> dict:
+    posts = Post.objects.filter(author_id=user_id).aggregate(
+        post_count=Count('pk', filter=Q(is_published=True)),
+        last_post=Max('created_at'),
+    )
+    comments = Comment.objects.filter(author_id=user_id).aggregate(
+        comment_count=Count('pk'),
+        last_comment=Max('created_at'),
+    )
+    activity = [date for date in (posts['last_post'],
+                                  comments['last_comment']) if date]
+    return {
+        'post_count': posts['post_count'],
+        'comment_count': comments['comment_count'],
+        'last_activity': max(activity, default=None),
+    }
+
+
+def recalculate_all_user_stats(batch_size: int = 1000) -> int:
+    """Пересчитывает статистику всех авторов и возвращает их число.
+
+    Счётчики всех пользователей считает один запрос с подзапросами,
+    а строки пишутся порциями через bulk_update и bulk_create.
+    Обнуляются и строки тех, у кого не осталось постов и комментариев.
+    """
+    posts = Post.objects.filter(author=OuterRef('pk')).order_by().values(
+        'author'
+    )
+    comments = Comment.objects.filter(author=OuterRef('pk')).order_by(
+    ).values('author')
+    users = get_user_model().objects.filter(
+        Exists(posts) | Exists(comments)
+        | Exists(UserStats.objects.filter(user=OuterRef('pk')))
+    ).annotate(
+        post_count=Coalesce(Subquery(posts.annotate(
+            n=Count('pk', filter=Q(is_published=True))
+        ).values('n')), 0),
+        last_post=Subquery(posts.annotate(
+            last=Max('created_at')
+        ).values('last')),
+        comment_count=Coalesce(Subquery(comments.annotate(
+            n=Count('pk')
+        ).values('n')), 0),
+        last_comment=Subquery(comments.annotate(
+            last=Max('created_at')
+        ).values('last')),
+        has_stats=Exists(UserStats.objects.filter(user=OuterRef('pk'))),
+    ).order_by('pk').values_list(
+        'pk', 'post_count', 'comment_count', 'last_post', 'last_comment',
+        'has_stats',
+    ).iterator(chunk_size=batch_size)
+    fields = ['post_count', 'comment_count', 'last_activity', 'updated_at']
+    total = 0
+    while True:
+        chunk = list(islice(users, batch_size))
+        if not chunk:
+            return total
+        now = timezone.now()
+        changed, created = [], []
+        for (user_id, post_count, comment_count, last_post, last_comment,
+             has_stats) in chunk:
+            activity = [date for date in (last_post, last_comment) if date]
+            stats = UserStats(
+                user_id=user_id, post_count=post_count,
+                comment_count=comment_count,
+                last_activity=max(activity, default=None), updated_at=now,
+            )
+            (changed if has_stats else created).append(stats)
+        with transaction.atomic():
+            UserStats.objects.bulk_update(changed, fields)
+            UserStats.objects.bulk_create(created)
+        total += len(chunk)
+
+
+def refresh_user_stats(user_id: int) -> None:
+    """Пересчитывает строку статистики и сбрасывает страницу профиля."""
+    username = get_user_model().objects.filter(
+        pk=user_id
+    ).values_list('username', flat=True).first()
+    if username is None:
+        # Пользователя удалили вместе с его постами
+        return
+    UserStats.objects.update_or_create(
+        user_id=user_id, defaults=calculate_user_stats(user_id)
+    )
+    purge_tags(f'profile:{username}')
+
+
+def schedule_stats_refresh(user_id: int) -> None:
+    """Пересчёт после коммита транзакции.
+
+    Удаление пользователя каскадом удаляет его посты, и создавать
+    строку статистики посреди этого нельзя.
+    """
+    transaction.on_commit(lambda: refresh_user_stats(user_id))
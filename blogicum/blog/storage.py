@@ -0,0 +1,85 @@
+import hashlib
+import os
+import posixpath
+import re
+from uuid import uuid4
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# posts_images/ab/ab12…ef.jpg и копии вида ab12…ef.640w.webp
+HASHED_NAME_RE = re.compile(r'(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{62}(?:\.|$)')
+
+
+def is_hashed_name(name: str) -> bool:
+    """Имя получено из хеша содержимого, и файл под ним не меняется."""
+    return bool(HASHED_NAME_RE.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, которое называет файлы по SHA-256 их содержимого.
+
+    Одинаковые загрузки попадают в один файл: если он уже есть,
+    повторно ничего не пишется. Удалять такой файл можно, только
+    когда на него не ссылается ни один пост (см. blog.media).
+
+    save() сам берёт ссылку на файл, ещё до проверки, записан ли он:
+    иначе delete_orphan мог бы удалить найденный файл раньше, чем его
+    сохранит пост. Ссылку забирает сохранённый пост, а если файл
+    так никуда и не попал, её нужно вернуть через release_file.
+    """
+
+    def save(self, name, content, max_length=None):
+        # Хранилище создаётся при импорте моделей, поэтому не раньше
+        from .media import release_file, retain_file
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_hashed_name(name, content)
+        retain_file(name)
+        try:
+            return self.save_as(name, content, max_length)
+        except Exception:
+            release_file(name)
+            raise
+
+    def save_as(self, name, content, max_length=None):
+        """Сохраняет файл под заданным именем, не переименовывая его.
+
+        Нужен для производных файлов, чьи имена выводятся из хеша
+        оригинала, например уменьшенных копий.
+        """
+        return super().save(name, content, max_length)
+
+    def get_hashed_name(self, name, content) -> str:
+        sha256 = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        digest = sha256.hexdigest()
+        directory, ext = posixpath.dirname(name), posixpath.splitext(name)[1]
+        if is_hashed_name(name):
+            # Производный файл кладём рядом, а не во вложенный каталог
+            directory = posixpath.dirname(directory)
+        return posixpath.join(directory, digest[:2], f'{digest}{ext.lower()}')
+
+    def get_available_name(self, name, max_length=None):
+        # Совпадение имён означает совпадение содержимого
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        # Пишем во временный файл и атомарно переименовываем: два
+        # одновременных сохранения одного содержимого не помешают друг другу
+        tmp_name = super()._save(f'{name}.{uuid4().hex}.part', content)
+        os.replace(self.path(tmp_name), self.path(name))
+        return name
+
+
+post_image_storage = ContentAddressedStorage()
@@ -0,0 +1,42 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from blog.cache import get_post_card_html
+from blog.images import get_renditions
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post):
+    """Карточка поста из кэша фрагментов."""
+    return mark_safe(get_post_card_html(post))
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post, rendition='card'):
+    """Изображение поста с адаптивными копиями в srcset.
+
+    Пока фоновый обработчик не закончил, показывается заглушка.
+    """
+    image = post.image
+    if not post.image_ready:
+        return {'image': image, 'ready': False}
+    renditions = get_renditions(image)
+    jpg = renditions['jpg']
+    if not jpg:
+        src = image.url
+    elif rendition == 'detail':
+        src = jpg[-1][0]
+    else:
+        src = jpg[0][0]
+    return {
+        'image': image,
+        'ready': True,
+        'src': src,
+        'jpg_srcset': ', '.join(f'{url} {width}w' for url, width in jpg),
+        'webp_srcset': ', '.join(
+            f'{url} {width}w' for url, width in renditions['webp']
+        ),
+        'sizes': '(max-width: 40rem) 100vw, 40rem',
+    }
@@ -10,6 +10,8 @@ urlpatterns = [
          views.CategoryPostsListView.as_view(),
          name='category_posts'),
 
+    path('search/', views.PostSearchView.as_view(), name='search'),
+
     path('posts/<int:post_id>/',
          views.PostView.as_view(),
          name='post_detail'),
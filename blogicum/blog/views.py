@@ -1,31 +1,157 @@
-from django.utils import timezone
-from django.shortcuts import get_object_or_404
-from django.urls import reverse_lazy, reverse
-from django.views import generic
-from .models import Post, Category, Comment
-from django.db.models import Count, Manager, QuerySet
+from hashlib import md5
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Manager, Max, QuerySet
+from django.db.models.functions import Greatest
 from django.http import HttpResponseRedirect, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse_lazy, reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import (http_date, parse_http_date_safe, quote_etag,
+                               urlencode)
+from django.views import generic
+
+from .cache import (get_cached_category, get_cached_page,
+                    get_comments_version, get_feed_changed_at, get_feed_key,
+                    get_feed_page_timeout, get_feed_version,
+                    get_next_publication, get_tag_versions, set_cached_page)
 from .forms import UserEditForm, CommentForm, PostForm
+from .metrics import record_cache
+from .models import Post, Comment
+from .paginators import (FeedPaginator, InvalidCursor, KeysetPaginator,
+                         WindowedPaginator)
+from .search import search_posts
+from .stats import get_user_stats
 
 
 def get_filtered_posts(manager: Manager,
                        only_published: bool = True,
                        ban_delayed: bool = True,
+                       now=None,
+                       related=('author', 'category'),
                        **conditions) -> QuerySet:
     if ban_delayed:
-        conditions['pub_date__date__lt'] = timezone.now()
+        conditions['pub_date__lte'] = now or timezone.now()
     if only_published:
         conditions['is_published'] = True
 
     return manager.filter(
         **conditions,
     ).select_related(
-        'author', 'location', 'category'
-    ).annotate(
-        comment_count=Count('comments')
-    ).order_by('-pub_date')
+        # Локацию карточка берёт из кэша (см. get_post_card_html)
+        *related
+    ).order_by('-pub_date', '-pk')
+
+
+class ObjectPerRequestMixin:
+    """Объект загружается из базы один раз за запрос.
+
+    dispatch() проверяет права на объект раньше, чем его получит
+    обработчик get()/post(), поэтому без запоминания запрос шёл дважды.
+    """
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+        return self._object
+
+
+class AnonymousPageCacheMixin:
+    """Кэш готовых страниц для анонимных посетителей.
+
+    Страница помечается тегами из get_page_cache_tags(); сигналы
+    сбрасывают теги, и все страницы с ними перестают отдаваться из кэша.
+    """
+
+    page_cache_timeout = 60 * 5
+
+    def get_page_cache_tags(self):
+        return ['blog']
+
+    def get_page_cache_timeout(self):
+        return self.page_cache_timeout
+
+    def get_page_cache_path(self, request):
+        return request.get_full_path()
+
+    def can_cache_page(self, request):
+        # Запросы с сессией могут отличаться содержимым: не кэшируем
+        return (request.method in ('GET', 'HEAD')
+                and settings.SESSION_COOKIE_NAME not in request.COOKIES)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.can_cache_page(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        path = self.get_page_cache_path(request)
+        versions = get_tag_versions(self.get_page_cache_tags())
+        response = get_cached_page(path, versions)
+        if response is not None:
+            return get_conditional_response(
+                request,
+                etag=response.get('ETag'),
+                last_modified=parse_http_date_safe(
+                    response.get('Last-Modified', '')
+                ),
+                response=response,
+            )
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.cookies:
+            timeout = self.get_page_cache_timeout()
+            if hasattr(response, 'add_post_render_callback'):
+                response.add_post_render_callback(
+                    lambda r: set_cached_page(path, versions, r, timeout)
+                )
+            else:
+                set_cached_page(path, versions, response, timeout)
+        return response
+
+
+class ConditionalGetMixin:
+    """ETag и Last-Modified без рендеринга шаблонов.
+
+    Валидаторы считаются дешёвым запросом из get_validator_state();
+    если клиент прислал совпадающие, отвечаем 304 Not Modified.
+    Категории, локации и имена авторов видны на странице, но не сдвигают
+    updated_at постов, поэтому в валидаторы входит и версия ленты,
+    которую сигналы меняют при их изменении.
+    """
+
+    def get_validator_state(self):
+        """Пара (время последнего изменения, доп. состояние для ETag)."""
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        last_modified, state = self.get_validator_state()
+        changed_at = get_feed_changed_at()
+        if last_modified is None or changed_at > last_modified:
+            last_modified = changed_at
+        # Страница зависит от пользователя и параметров запроса
+        etag = quote_etag(md5(
+            f'{request.get_full_path()}|{request.user.pk}|'
+            f'{last_modified}|{state}|{get_feed_version()}'.encode()
+        ).hexdigest())
+        last_modified = (
+            int(last_modified.timestamp()) if last_modified else None
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Cookie',))
+        return response
 
 
 class PostMixin:
@@ -35,25 +161,172 @@ class PostMixin:
     paginate_by = 10
 
 
-class PostListView(PostMixin, generic.ListView):
+class KeysetPaginationMixin:
+    """Курсорная пагинация ленты через ?after= / ?before=.
+
+    Первые `offset_pages` страниц доступны и по старым ссылкам ?page=N,
+    дальше лента листается только курсорами: ?page= с большим номером
+    (и ?page=last у длинной ленты) отдаёт 404, а не запрос с OFFSET.
+    """
+
+    paginator_class = FeedPaginator
+    keyset_paginator_class = KeysetPaginator
+    keyset_pagination = True
+    offset_pages = 5
+
+    def get_paginator(self, *args, **kwargs):
+        if self.keyset_pagination:
+            kwargs.setdefault('offset_pages', self.offset_pages)
+        return super().get_paginator(*args, **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get('after')
+        before = self.request.GET.get('before')
+        if not self.keyset_pagination or not (after or before):
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = self.keyset_paginator_class(queryset, page_size)
+        try:
+            page = paginator.page(after=after, before=before)
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class PostListView(AnonymousPageCacheMixin, ConditionalGetMixin,
+                   KeysetPaginationMixin, PostMixin, generic.ListView):
     template_name = 'blog/index.html'
-    queryset = get_filtered_posts(Post.objects, category__is_published=True)
+    # Сколько первых страниц ленты держим в кэше
+    cached_pages = 3
 
+    def get_page_cache_tags(self):
+        return super().get_page_cache_tags() + ['index']
 
-class CategoryPostsListView(PostListView):
-    template_name = 'blog/category.html'
+    def get_page_cache_timeout(self):
+        # Страница ленты не должна пережить выход отложенного поста
+        return min(
+            super().get_page_cache_timeout(),
+            get_feed_page_timeout(self.now, self.get_next_publication())
+        )
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        # Граница публикации фиксируется один раз на запрос
+        self.now = timezone.now()
 
     def get_queryset(self):
-        # Получаем slug категории из URL
-        category_slug = self.kwargs.get('category')
+        return get_filtered_posts(
+            Post.objects, now=self.now, category__is_published=True
+        )
+
+    def get_next_publication(self):
+        if not hasattr(self, '_next_publication'):
+            self._next_publication = get_next_publication(self.now)
+        return self._next_publication
 
-        # Получаем объект категории или вызываем 404,
-        # если не найдено или не опубликовано
-        self.category = get_object_or_404(
-            Category, slug=category_slug, is_published=True
+    def get_feed_name(self):
+        """Имя ленты в ключах кэша; у разных наборов постов оно разное."""
+        return self.request.resolver_match.view_name
+
+    def get_feed_cache_key(self, suffix):
+        return get_feed_key(
+            self.get_feed_name(), suffix, self.get_next_publication()
+        )
+
+    def get_paginator(self, *args, **kwargs):
+        # Число постов кэшируется до следующего изменения ленты
+        kwargs.setdefault('count_key', self.get_feed_cache_key('count'))
+        kwargs.setdefault('count_timeout', get_feed_page_timeout(
+            self.now, self.get_next_publication()
+        ))
+        kwargs.setdefault('approximate_after',
+                          settings.BLOG_FEED_APPROXIMATE_COUNT)
+        return super().get_paginator(*args, **kwargs)
+
+    def get_validator_state(self):
+        # Комментарии сдвигают updated_at поста и видны в карточках
+        key = self.get_feed_cache_key(f'modified:{get_comments_version()}')
+        # В пустой ленте время изменения — None, и его тоже нужно
+        # закэшировать: поэтому храним кортеж, а не само значение
+        cached = cache.get(key)
+        if cached is None:
+            # Отложенный пост, вышедший в ленту, тоже меняет её:
+            # поэтому учитываем и дату публикации
+            last_modified = self.get_queryset().order_by().aggregate(
+                last_modified=Max(Greatest('updated_at', 'pub_date'))
+            )['last_modified']
+            cached = (last_modified,)
+            cache.set(key, cached, get_feed_page_timeout(
+                self.now, self.get_next_publication()
+            ))
+        # Удалённый пост не сдвигает время изменения, но меняет число постов
+        total = self.get_paginator(
+            self.get_queryset(), self.get_paginate_by(None)
+        ).count
+        return cached[0], total
+
+    def get_cached_page_number(self):
+        """Номер страницы, если её можно отдать из кэша."""
+        if {'after', 'before'} & set(self.request.GET):
+            return None
+        page = self.request.GET.get(self.page_kwarg) or '1'
+        if not page.isdigit() or not 1 <= int(page) <= self.cached_pages:
+            return None
+        return int(page)
+
+    def paginate_queryset(self, queryset, page_size):
+        page_number = self.get_cached_page_number()
+        if page_number is None:
+            return super().paginate_queryset(queryset, page_size)
+
+        key = self.get_feed_cache_key(
+            f'{page_number}:{get_comments_version()}'
+        )
+        cached = cache.get(key)
+        record_cache('feed_page', cached is not None)
+        if cached is None:
+            paginator, page, object_list, is_paginated = (
+                super().paginate_queryset(queryset, page_size)
+            )
+            cache.set(key, (paginator.count, paginator.is_approximate,
+                            list(object_list)),
+                      get_feed_page_timeout(self.now,
+                                            self.get_next_publication()))
+            return paginator, page, object_list, is_paginated
+
+        count, is_approximate, object_list = cached
+        paginator = self.get_paginator(
+            queryset, page_size, orphans=self.get_paginate_orphans(),
+            allow_empty_first_page=self.get_allow_empty()
         )
+        # Подставляем сохранённое число постов, чтобы не делать COUNT(*)
+        paginator.count = count
+        paginator.is_approximate = is_approximate
+        page = paginator._get_page(object_list, page_number, paginator)
+        return paginator, page, page.object_list, page.has_other_pages()
 
-        return get_filtered_posts(self.category.posts)
+
+class CategoryPostsListView(PostListView):
+    template_name = 'blog/category.html'
+    cached_pages = 0
+
+    def get_page_cache_tags(self):
+        return ['blog', f'category:{self.kwargs["category"]}']
+
+    def get_feed_name(self):
+        return f'{super().get_feed_name()}:{self.kwargs["category"]}'
+
+    def get_queryset(self):
+        # Категория берётся из кэша: get_queryset() зовётся и для ETag,
+        # и для ленты, а в базу за ней не ходим вовсе
+        if not hasattr(self, 'category'):
+            self.category = get_cached_category(self.kwargs['category'])
+        if self.category is None or not self.category.is_published:
+            raise Http404('Категория не найдена')
+
+        return get_filtered_posts(
+            Post.objects, now=self.now, category=self.category
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -62,22 +335,84 @@ class CategoryPostsListView(PostListView):
         return context
 
 
-class PostDetailView(PostMixin, generic.DetailView):
+class PostSearchView(PostMixin, generic.ListView):
+    """Поиск по заголовкам и текстам видимых в ленте постов."""
+
+    template_name = 'blog/search.html'
+    paginator_class = WindowedPaginator
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        if not self.query:
+            return Post.objects.none()
+        return search_posts(
+            get_filtered_posts(Post.objects, category__is_published=True),
+            self.query
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        # Ссылки пагинатора должны сохранять запрос
+        context['page_query'] = urlencode({'q': self.query}) + '&'
+        return context
+
+
+class PostDetailView(AnonymousPageCacheMixin, ConditionalGetMixin,
+                     ObjectPerRequestMixin, PostMixin, generic.DetailView):
     template_name = 'blog/detail.html'
     context_object_name = 'post'
+    queryset = Post.objects.select_related('author', 'category', 'location')
+    # Сколько последних комментариев показываем и догружаем за раз
+    comments_window = 50
+
+    def get_page_cache_tags(self):
+        return ['blog', f'post:{self.kwargs["post_id"]}']
+
+    def get_validator_state(self):
+        # Комментарии сдвигают updated_at поста, отдельный запрос не нужен
+        post = self.get_object()
+        return post.updated_at, post.comment_count
+
+    def get_comments_limit(self):
+        """Число комментариев: кратно окну и не больше BLOG_COMMENTS_MAX.
+
+        Иначе каждое значение ?comments= было бы отдельной страницей
+        в кэше, а большое значение выводило бы все комментарии сразу.
+        """
+        try:
+            limit = int(self.request.GET.get('comments', 0))
+        except ValueError:
+            limit = 0
+        window = self.comments_window
+        limit = -(-max(limit, window) // window) * window
+        return min(limit, settings.BLOG_COMMENTS_MAX)
+
+    def get_page_cache_path(self, request):
+        # Прочие параметры страницу не меняют
+        return f'{request.path}?comments={self.get_comments_limit()}'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Добавляем комментарии к посту
-        context['comments'] = self.object.comments.order_by('created_at')
+        # Последние комментарии вместе с авторами одним запросом
+        limit = self.get_comments_limit()
+        comments = list(
+            self.object.comments.select_related('author').order_by(
+                '-created_at', '-pk'
+            )[:limit + 1]
+        )
+        context['has_more_comments'] = (
+            len(comments) > limit and limit < settings.BLOG_COMMENTS_MAX
+        )
+        context['more_comments_limit'] = limit + self.comments_window
+        context['comments'] = comments[:limit][::-1]
         context['form'] = CommentForm()
         return context
 
     def dispatch(self, request, *args, **kwargs):
         post = self.get_object()
         # Если пост не опубликован и пользователь не автор, возвращаем 404
-        if not post.is_published and (not request.user.is_authenticated
-                                      or request.user != post.author):
+        if not post.is_published and post.author_id != request.user.pk:
             raise Http404("Пост не найден.")
         return super().dispatch(request, *args, **kwargs)
 
@@ -96,7 +431,7 @@ class PostCreateView(LoginRequiredMixin, PostMixin, generic.CreateView):
                             kwargs={'username': self.request.user.username})
 
 
-class PostRequiredMixin:
+class PostRequiredMixin(ObjectPerRequestMixin):
     def dispatch(self, request, *args, **kwargs):
         # Если пользователь не авторизован
         if not request.user.is_authenticated:
@@ -108,7 +443,7 @@ class PostRequiredMixin:
 
         # Проверяем, является ли пользователь автором поста
         post = self.get_object()
-        if post.author != request.user:
+        if post.author_id != request.user.pk:
             # Вместо 403 ошибки перенаправляем на страницу публикации
             return HttpResponseRedirect(
                 reverse('blog:post_detail',
@@ -140,6 +475,11 @@ class CommentMixin(LoginRequiredMixin):
     pk_url_kwarg = 'comment_id'
     template_name = 'blog/comment.html'
 
+    def post(self, request, *args, **kwargs):
+        """Комментарий и счётчик поста меняются в одной транзакции."""
+        with transaction.atomic():
+            return super().post(request, *args, **kwargs)
+
     def get_post(self):
         """Получение поста по переданному ID."""
         return get_object_or_404(Post, pk=self.kwargs['post_id'])
@@ -161,11 +501,11 @@ class CommentCreateView(CommentMixin, generic.CreateView):
     """Создание комментария."""
 
 
-class CommentRequiredMixin:
+class CommentRequiredMixin(ObjectPerRequestMixin):
     def dispatch(self, request, *args, **kwargs):
         # Проверяем, является ли пользователь автором комментария
         сomment = self.get_object()
-        if сomment.author != request.user:
+        if сomment.author_id != request.user.pk:
             # Вместо 403 ошибки перенаправляем на страницу публикации
             return HttpResponseRedirect(
                 reverse('blog:post_detail',
@@ -201,34 +541,61 @@ class PostView(generic.View):
 
 class UserProfilelView(PostListView):
     template_name = 'blog/profile.html'
+    cached_pages = 0
+
+    def get_page_cache_tags(self):
+        return ['blog', f'profile:{self.kwargs["username"]}']
+
+    def get_feed_name(self):
+        # Владелец видит и неопубликованные посты — это другая лента
+        audience = 'owner' if self.is_owner else 'public'
+        return (f'{super().get_feed_name()}:'
+                f'{self.profile_user.pk}:{audience}')
 
     def dispatch(self, request, *args, **kwargs):
-        # Определяем, является ли текущий пользователь владельцем профиля
+        # Пользователь загружается один раз вместе со статистикой,
+        # дальше лента фильтруется по его первичному ключу
         self.profile_user = get_object_or_404(
-            get_user_model(),
+            get_user_model().objects.select_related('blog_stats'),
             username=self.kwargs['username']
         )
-        self.is_owner = request.user.is_authenticated \
-            and (request.user == self.profile_user)
+        self.stats = get_user_stats(self.profile_user)
+        # Определяем, является ли текущий пользователь владельцем профиля
+        self.is_owner = request.user.pk == self.profile_user.pk
         return super().dispatch(request, *args, **kwargs)
 
+    def get_validator_state(self):
+        last_modified, total = super().get_validator_state()
+        if self.stats.updated_at and (
+            last_modified is None or self.stats.updated_at > last_modified
+        ):
+            last_modified = self.stats.updated_at
+        return last_modified, (total, self.stats.comment_count)
+
     def get_context_data(self, **kwargs):
         context_data = super().get_context_data(**kwargs)
         context_data['profile'] = self.profile_user
+        context_data['stats'] = self.stats
+        # Автор всех постов известен, к ленте его не присоединяем
+        for post in context_data['page_obj']:
+            post.author = self.profile_user
         return context_data
 
     def get_queryset(self):
         if self.is_owner:  # Если владелец профиля, показываем все записи
             return get_filtered_posts(
                 Post.objects,
-                author__username=self.kwargs['username'],
+                related=('category',),
+                author=self.profile_user,
                 only_published=False,  # включаем неопубликованные
                 ban_delayed=False      # включаем отложенные
             )
         else:  # Если не владелец, показываем только допустимые записи
             return get_filtered_posts(
                 Post.objects,
-                author__username=self.kwargs['username']
+                related=('category',),
+                now=self.now,
+                author=self.profile_user
             )
 
 
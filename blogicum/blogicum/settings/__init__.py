@@ -0,0 +1,21 @@
+"""Настройки blogicum.
+
+Профиль выбирается переменной окружения DJANGO_ENV: dev (по умолчанию)
+или prod. Можно и указать модуль профиля напрямую, например
+DJANGO_SETTINGS_MODULE=blogicum.settings.prod.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'dev')
+
+if DJANGO_ENV == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif DJANGO_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(
+        f'Неизвестный профиль DJANGO_ENV={DJANGO_ENV!r}: ожидается dev'
+        ' или prod.'
+    )
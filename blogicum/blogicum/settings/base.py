@@ -0,0 +1,231 @@
+"""
+Общие настройки blogicum; профили dev и prod дополняют их.
+
+Generated by 'django-admin startproject' using Django 3.2.16.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/3.2/ref/settings/
+"""
+
+import os
+from pathlib import Path
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+def env_list(name: str, default: str = '') -> list:
+    """Список из переменной окружения через запятую."""
+    return [item.strip() for item in os.environ.get(name, default).split(',')
+            if item.strip()]
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+# Ключ по умолчанию годится только для разработки: prod без
+# DJANGO_SECRET_KEY не запустится
+SECRET_KEY = (
+    os.environ.get('DJANGO_SECRET_KEY')
+    or 'django-insecure-9caa4tjn_+&p(0fivep(*wer4__1p3_9^9q@^z=tylm9=(ebro'
+)
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = env_bool('DJANGO_DEBUG')
+
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS')
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'blog.apps.BlogConfig',
+    'pages.apps.PagesConfig',
+    'django.contrib.admin',
+    'django.contrib.auth',   # Приложение для работы с пользователями.
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'django_bootstrap5',
+]
+
+MIDDLEWARE = [
+    # Первым, чтобы замерять все остальные middleware
+    'blog.middleware.RequestTimingMiddleware',
+    'blog.middleware.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+# Подключаем бэкенд filebased.EmailBackend:
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Указываем директорию, в которую будут сохраняться файлы писем:
+EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
+
+ROOT_URLCONF = 'blogicum.urls'
+
+TEMPLATES_DIR = BASE_DIR / 'templates'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'blogicum.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/3.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DJANGO_DB_PATH', BASE_DIR / 'db.sqlite3'),
+    }
+}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/3.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru-RU'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/3.2/howto/static-files/
+
+STATIC_URL = '/static/'
+
+# Дополнительные директории, где собраны статические файлы проекта.
+STATICFILES_DIRS = [
+    BASE_DIR / 'static_dev',
+]
+
+MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_URL = '/media/'
+
+# Кто передаёт загруженные файлы: None — сам Django (FileResponse),
+# 'x-accel-redirect' — nginx, 'x-sendfile' — Apache с mod_xsendfile
+BLOG_MEDIA_SENDFILE = None
+# internal-локация nginx, указывающая на MEDIA_ROOT
+BLOG_MEDIA_ACCEL_PREFIX = '/_protected_media/'
+# Срок кеширования файлов без хеша в имени
+BLOG_MEDIA_MAX_AGE = 24 * 60 * 60
+
+# Загрузки крупнее этого порога пишутся во временный файл, а не в память
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2 * 1024 * 1024
+
+# Ограничения для изображений постов
+BLOG_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+# Больше пикселей отклоняем по заголовку, не декодируя файл
+BLOG_IMAGE_MAX_PIXELS = 50_000_000
+# Форматы без декодирования в уменьшенном масштабе (всё, кроме JPEG)
+# приходится распаковывать целиком, поэтому для них лимит строже
+BLOG_IMAGE_MAX_DECODE_PIXELS = 16_000_000
+# Изображения с большей стороной уменьшаются до этого размера
+BLOG_IMAGE_MAX_SIDE = 2560
+
+# Больше комментариев на странице поста не выводим даже по ?comments=
+BLOG_COMMENTS_MAX = 1000
+
+# Если задано, число постов в ленте считается только до этого значения,
+# а пагинатор показывает «дальше» вместо ссылки на последнюю страницу
+BLOG_FEED_APPROXIMATE_COUNT = None
+
+# Доля запросов, для которых замеряются время, SQL и рендеринг;
+# 0 — middleware замеров отключён полностью
+BLOG_TIMING_SAMPLE_RATE = float(
+    os.environ.get('BLOG_TIMING_SAMPLE_RATE', 0.0)
+)
+# Одинаковая форма SQL чаще этого числа раз за запрос — признак N+1
+BLOG_TIMING_N_PLUS_ONE = 5
+# Отдавать ли замеры клиенту в заголовке Server-Timing
+BLOG_TIMING_HEADER = True
+
+# Метрики Prometheus на /metrics
+BLOG_METRICS_ENABLED = True
+# Общий каталог для воркеров gunicorn: каждый процесс пишет свой файл,
+# /metrics складывает их. Без каталога метрики видны только процессу.
+# Каталог очищает хук on_starting из gunicorn.conf.py
+BLOG_METRICS_DIR = os.environ.get('BLOG_METRICS_DIR')
+# Кому отдаются метрики: адреса и сети клиентов или запрос
+# с заголовком «Authorization: Bearer <токен>»
+BLOG_METRICS_ALLOWED_IPS = env_list('BLOG_METRICS_ALLOWED_IPS',
+                                    '127.0.0.1,::1')
+BLOG_METRICS_TOKEN = os.environ.get('BLOG_METRICS_TOKEN')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'blog.timing': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+LOGIN_REDIRECT_URL = ''
@@ -0,0 +1,115 @@
+"""Настройки для продакшена.
+
+Всё, что зависит от окружения, задаётся переменными: DJANGO_SECRET_KEY
+и DJANGO_ALLOWED_HOSTS обязательны, остальные имеют значения по
+умолчанию. При импорте профиль проверяет себя и не даёт запустить
+сервис с компонентами для разработки.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR, DATABASES, TEMPLATES, env_bool, env_list
+
+# Включается только переменной, и тогда проверка ниже не даст запуститься
+DEBUG = env_bool('DJANGO_DEBUG')
+
+# Соединение с БД живёт между запросами, а не открывается на каждый
+CONN_MAX_AGE = int(os.environ.get('DJANGO_CONN_MAX_AGE', 60))
+DATABASES = {
+    **DATABASES,
+    'default': {**DATABASES['default'], 'CONN_MAX_AGE': CONN_MAX_AGE},
+}
+
+# Шаблоны компилируются один раз на процесс
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+
+# Версии лент и тегов страниц хранятся в кэше, поэтому он должен быть
+# общим для всех воркеров. Файловый кэш работает без зависимостей,
+# для нескольких серверов задайте Redis или Memcached
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'BLOG_CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache',
+        ),
+        'LOCATION': os.environ.get('BLOG_CACHE_LOCATION',
+                                   str(BASE_DIR / '.cache')),
+    }
+}
+
+EMAIL_BACKEND = os.environ.get(
+    'DJANGO_EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend'
+)
+
+# Раздачу загруженных файлов берёт на себя веб-сервер
+BLOG_MEDIA_SENDFILE = os.environ.get('BLOG_MEDIA_SENDFILE') or None
+# Не раскрываем клиентам время запросов к БД
+BLOG_TIMING_HEADER = False
+
+# За обратным прокси все клиенты приходят с его адреса, поэтому
+# localhost по умолчанию не доверяем. Без токена или списка адресов
+# метрики выключены
+BLOG_METRICS_ALLOWED_IPS = env_list('BLOG_METRICS_ALLOWED_IPS')
+BLOG_METRICS_TOKEN = os.environ.get('BLOG_METRICS_TOKEN')
+BLOG_METRICS_ENABLED = bool(BLOG_METRICS_ALLOWED_IPS or BLOG_METRICS_TOKEN)
+
+# Компоненты, которые не должны попасть в продакшен
+DEV_ONLY_APPS = {'debug_toolbar'}
+DEV_ONLY_MIDDLEWARE = {'debug_toolbar.middleware.DebugToolbarMiddleware'}
+DEV_ONLY_CACHES = {
+    # Кэш в памяти у каждого воркера свой: сброс версий не дойдёт
+    # до остальных, и они будут отдавать устаревшие страницы
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+DEV_ONLY_EMAIL_BACKENDS = {
+    'django.core.mail.backends.console.EmailBackend',
+    'django.core.mail.backends.filebased.EmailBackend',
+    'django.core.mail.backends.locmem.EmailBackend',
+}
+
+
+def get_dev_only_components(namespace: dict) -> list:
+    """Что в настройках годится только для разработки."""
+    problems = []
+    if namespace['DEBUG']:
+        problems.append('DEBUG = True')
+    if namespace['SECRET_KEY'].startswith('django-insecure-'):
+        problems.append('SECRET_KEY для разработки (задайте'
+                        ' DJANGO_SECRET_KEY)')
+    if not namespace['ALLOWED_HOSTS']:
+        problems.append('пустой ALLOWED_HOSTS (задайте DJANGO_ALLOWED_HOSTS)')
+    problems.extend(f'приложение {app}' for app in namespace['INSTALLED_APPS']
+                    if app in DEV_ONLY_APPS)
+    problems.extend(f'middleware {name}' for name in namespace['MIDDLEWARE']
+                    if name in DEV_ONLY_MIDDLEWARE)
+    problems.extend(
+        f'кэш {alias}: {config["BACKEND"]}'
+        for alias, config in namespace['CACHES'].items()
+        if config['BACKEND'] in DEV_ONLY_CACHES
+    )
+    if namespace['EMAIL_BACKEND'] in DEV_ONLY_EMAIL_BACKENDS:
+        problems.append(f'почта {namespace["EMAIL_BACKEND"]}')
+    return problems
+
+
+_problems = get_dev_only_components(globals())
+if _problems:
+    raise ImproperlyConfigured(
+        'Профиль prod не запускается с компонентами для разработки: '
+        + '; '.join(_problems)
+    )
@@ -8,13 +8,12 @@ from django.contrib.auth.forms import UserCreationForm
 from django.views.generic.edit import CreateView
 
 # К импортам из django.urls добавьте импорт функции reverse_lazy
-from django.urls import include, path
+from django.urls import include, path, re_path
 
+from blog.media import serve_media
+from blog.metrics import metrics_view
 from .views import MyLoginView
 
-# Импортируем функцию, позволяющую серверу разработки отдавать файлы.
-from django.conf.urls.static import static
-
 
 handler404 = 'pages.views.page_not_found'
 handler500 = 'pages.views.custom_500'
@@ -37,10 +36,19 @@ urlpatterns = [
     path('auth/login/', MyLoginView.as_view(), name='login'),
 
     path('auth/', include('django.contrib.auth.urls')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+    path('metrics', metrics_view, name='metrics'),
+
+    # Загруженные файлы: файлы с хешем в имени отдаются с immutable
+    re_path(
+        r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'),
+        serve_media,
+        name='media',
+    ),
+]
 
 # Если проект запущен в режиме разработки...
-if settings.DEBUG:
+if 'debug_toolbar' in settings.INSTALLED_APPS:
     import debug_toolbar
     # Добавить к списку urlpatterns список адресов из приложения debug_toolbar:
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)
@@ -0,0 +1,18 @@
+"""Настройки gunicorn: gunicorn blogicum.wsgi -c gunicorn.conf.py"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+
+
+def on_starting(server):
+    """Убирает метрики воркеров прошлого запуска.
+
+    Вызывается один раз в главном процессе до запуска воркеров.
+    """
+    directory = os.environ.get('BLOG_METRICS_DIR')
+    if directory:
+        from blog.metrics import clear_directory
+
+        os.makedirs(directory, exist_ok=True)
+        clear_directory(directory)
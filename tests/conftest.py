@@ -41,6 +41,25 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+
+    from blog.cache import invalidate_lookups
+
+    cache.clear()
+    invalidate_lookups()
+    yield
+    cache.clear()
+    invalidate_lookups()
+
+
+@pytest.fixture
+def media_root(tmp_path):
+    with override_settings(MEDIA_ROOT=tmp_path):
+        yield tmp_path
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
@@ -0,0 +1,54 @@
+"""Пропускная способность отдачи медиафайлов: serve_media против static().
+
+Запуск: BLOG_BENCHMARK=1 pytest tests/test_benchmark_media.py -s
+"""
+import os
+import time
+
+import pytest
+from django.conf import settings
+from django.test import RequestFactory, override_settings
+from django.views.static import serve
+
+from blog.media import serve_media
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("BLOG_BENCHMARK"),
+    reason="Бенчмарк запускается только с BLOG_BENCHMARK=1",
+)
+
+FILE_SIZE = 1024 * 1024
+DURATION = 2.0
+
+
+def _throughput(view, path):
+    request = RequestFactory().get(f"/media/{path}")
+    requests = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        response = view(request, path)
+        for _ in getattr(response, "streaming_content", ()):
+            pass
+        response.close()
+        requests += 1
+    return requests / (time.perf_counter() - start)
+
+
+def test_media_throughput(media_root):
+    (media_root / "bench.bin").write_bytes(os.urandom(FILE_SIZE))
+
+    def static_view(request, path):
+        return serve(request, path, document_root=settings.MEDIA_ROOT)
+
+    before = _throughput(static_view, "bench.bin")
+    after = _throughput(serve_media, "bench.bin")
+    with override_settings(BLOG_MEDIA_SENDFILE="x-accel-redirect"):
+        offload = _throughput(serve_media, "bench.bin")
+    print(
+        f"\nФайл 1 МБ: django.views.static.serve {before:.0f} rps,"
+        f" serve_media {after:.0f} rps,"
+        f" serve_media + X-Accel-Redirect {offload:.0f} rps"
+    )
+    assert after >= before * 0.8, (
+        "serve_media не должна быть заметно медленнее static()."
+    )
@@ -0,0 +1,82 @@
+"""Замер ленты на 100 000 постов: фильтр по дате против фильтра по времени.
+
+Запуск: BLOG_BENCHMARK=1 pytest tests/test_benchmark_pub_date.py -s
+"""
+import os
+import statistics
+import time
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from blog.models import Category, Post
+from blog.views import get_filtered_posts
+
+pytestmark = [
+    pytest.mark.django_db,
+    pytest.mark.skipif(
+        not os.environ.get("BLOG_BENCHMARK"),
+        reason="Бенчмарк запускается только с BLOG_BENCHMARK=1",
+    ),
+]
+
+N_POSTS = 100_000
+N_RUNS = 50
+
+
+@pytest.fixture
+def many_posts():
+    author = get_user_model().objects.create(username="bench_author")
+    category = Category.objects.create(
+        title="Бенчмарк", description="-", slug="bench"
+    )
+    now = timezone.now()
+    # Пятая часть постов отложена: их приходится пропускать в начале ленты
+    Post.objects.bulk_create(
+        (
+            Post(
+                title=f"Пост {i}",
+                text="Текст",
+                author=author,
+                category=category,
+                pub_date=now + timedelta(minutes=N_POSTS // 5 - i),
+            )
+            for i in range(N_POSTS)
+        ),
+        batch_size=5000,
+    )
+
+
+def _median_ms(queryset_factory):
+    timings = []
+    for _ in range(N_RUNS):
+        start = time.perf_counter()
+        list(queryset_factory()[:10])
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def test_pub_date_filter_latency(many_posts):
+    def before():
+        return Post.objects.filter(
+            is_published=True,
+            category__is_published=True,
+            pub_date__date__lt=timezone.now(),
+        ).select_related("author", "location", "category").order_by(
+            "-pub_date", "-pk"
+        )
+
+    def after():
+        return get_filtered_posts(Post.objects, category__is_published=True)
+
+    before_ms = _median_ms(before)
+    after_ms = _median_ms(after)
+    print(
+        f"\nЛента, {N_POSTS} постов: pub_date__date__lt {before_ms:.2f} мс,"
+        f" pub_date__lte {after_ms:.2f} мс"
+    )
+    assert after_ms <= before_ms, (
+        "Фильтр по pub_date__lte должен быть не медленнее фильтра по дате."
+    )
@@ -0,0 +1,239 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+from blog import bulk
+from blog.management.commands.blog_import import Command
+from blog.models import Category, Comment, Location, Post, UserStats
+from blog.search import search_posts
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def blog_content(mixer: Mixer, user, another_user):
+    category = mixer.blend("blog.Category", is_published=True)
+    location = mixer.blend("blog.Location", is_published=True)
+    posts = mixer.cycle(5).blend(
+        "blog.Post", author=user, category=category, location=location,
+        is_published=True, pub_date=timezone.now() - timedelta(days=1),
+        title=mixer.sequence("Импортируемая публикация {0}"),
+    )
+    mixer.cycle(3).blend("blog.Comment", post=posts[0], author=another_user)
+    created_at = timezone.now() - timedelta(days=30)
+    Post.objects.filter(pk=posts[1].pk).update(created_at=created_at)
+    return posts
+
+
+def clear_content():
+    Comment.objects.all().delete()
+    Post.objects.all().delete()
+    Category.objects.all().delete()
+    Location.objects.all().delete()
+    get_user_model().objects.all().delete()
+
+
+def snapshot():
+    return {
+        model: list(model.objects.order_by("pk").values())
+        for model in bulk.get_export_models()
+    }
+
+
+def export(path, **options):
+    call_command("blog_export", str(path), stdout=StringIO(), **options)
+
+
+def test_export_import_round_trip(tmp_path, blog_content):
+    path = tmp_path / "blog.jsonl"
+    export(path, batch_size=2)
+    expected = snapshot()
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == sum(map(len, expected.values()))
+    assert json.loads(lines[0])["model"] == "auth.user"
+
+    clear_content()
+    out = StringIO()
+    call_command("blog_import", str(path), batch_size=3, stdout=out)
+    assert snapshot() == expected, (
+        "Убедитесь, что blog_import восстанавливает выгруженные объекты"
+        " без изменений, включая даты создания."
+    )
+    assert "строк/с" in out.getvalue(), (
+        "Убедитесь, что команды сообщают скорость в строках в секунду."
+    )
+    assert not (tmp_path / "blog.jsonl.progress").exists()
+
+
+def test_import_refreshes_derived_data(tmp_path, user, blog_content):
+    path = tmp_path / "blog.jsonl"
+    export(path)
+    clear_content()
+    call_command("blog_import", str(path), stdout=StringIO())
+
+    assert Post.objects.get(pk=blog_content[0].pk).comment_count == 3
+    assert UserStats.objects.get(user_id=user.pk).post_count == 5, (
+        "Убедитесь, что после загрузки пересчитывается статистика"
+        " пользователей: bulk_create не вызывает сигналы."
+    )
+    found = search_posts(Post.objects.all(), "импортируемая публикация")
+    assert found.count() == 5, (
+        "Убедитесь, что загруженные посты попадают в поисковый индекс."
+    )
+
+
+def test_import_resumes_after_failure(tmp_path, monkeypatch, blog_content):
+    path = tmp_path / "blog.jsonl"
+    export(path)
+    expected = snapshot()
+    clear_content()
+
+    load_records = bulk.load_records
+    calls = []
+
+    def failing_load(records, conflicts=None):
+        calls.append(len(records))
+        if len(calls) == 3:
+            raise DatabaseError("соединение потеряно")
+        return load_records(records, conflicts)
+
+    monkeypatch.setattr(
+        "blog.management.commands.blog_import.load_records", failing_load
+    )
+    with pytest.raises(CommandError):
+        call_command("blog_import", str(path), batch_size=3,
+                     stdout=StringIO())
+    progress = json.loads((tmp_path / "blog.jsonl.progress").read_text())
+    assert progress["rows"] == 6
+
+    calls.clear()
+    call_command("blog_import", str(path), batch_size=3, resume=True,
+                 stdout=StringIO())
+    total = sum(map(len, expected.values()))
+    assert sum(calls) == total - 6, (
+        "Убедитесь, что с --resume загрузка продолжается с места сбоя,"
+        " а не с начала файла."
+    )
+    assert snapshot() == expected
+
+
+def test_resume_after_crash_before_checkpoint(tmp_path, monkeypatch,
+                                              blog_content):
+    path = tmp_path / "blog.jsonl"
+    export(path)
+    expected = snapshot()
+    clear_content()
+
+    save_checkpoint = Command.save_checkpoint
+    calls = []
+
+    def crashing_save(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            # Порция уже в базе, а прогресс ещё не записан
+            raise OSError("процесс остановлен")
+        save_checkpoint(*args)
+
+    monkeypatch.setattr(Command, "save_checkpoint",
+                        staticmethod(crashing_save))
+    with pytest.raises(OSError):
+        call_command("blog_import", str(path), batch_size=3,
+                     stdout=StringIO())
+    monkeypatch.undo()
+
+    out = StringIO()
+    call_command("blog_import", str(path), batch_size=3, resume=True,
+                 stdout=out)
+    assert snapshot() == expected, (
+        "Убедитесь, что повторно загруженная после сбоя порция не теряет"
+        " связанные объекты."
+    )
+    assert "из-за занятых ключей: 0" in out.getvalue(), (
+        "Убедитесь, что объекты, уже загруженные до сбоя, не считаются"
+        " объектами с занятым ключом."
+    )
+
+
+def test_repeated_import_does_not_duplicate(tmp_path, blog_content):
+    path = tmp_path / "blog.jsonl"
+    export(path)
+    expected = snapshot()
+    call_command("blog_import", str(path), stdout=StringIO())
+    assert snapshot() == expected
+
+
+def test_taken_keys_not_overwritten(tmp_path, mixer: Mixer, blog_content):
+    path = tmp_path / "blog.jsonl"
+    export(path)
+    clear_content()
+    stranger = mixer.blend(get_user_model(), username="stranger")
+    existing = mixer.blend("blog.Post", pk=blog_content[0].pk,
+                           author=stranger, category=None, location=None,
+                           title="Чужая публикация")
+
+    out = StringIO()
+    call_command("blog_import", str(path), stdout=out)
+    existing.refresh_from_db()
+    assert existing.title == "Чужая публикация", (
+        "Убедитесь, что загрузка не перезаписывает объекты с тем же ключом."
+    )
+    assert not Comment.objects.exists(), (
+        "Убедитесь, что комментарии к незагруженному посту не попадают"
+        " к чужому посту с тем же ключом."
+    )
+    assert Post.objects.count() == 5
+    assert "из-за занятых ключей: 1" in out.getvalue(), (
+        "Убедитесь, что объекты с занятыми ключами не считаются"
+        " загруженными."
+    )
+
+
+def test_missing_relations_resolved(tmp_path, user, blog_content):
+    path = tmp_path / "blog.jsonl"
+    export(path)
+    dropped = {("blog.location", location.pk)
+               for location in Location.objects.all()}
+    dropped.add(("blog.post", blog_content[0].pk))
+    lines = [
+        line for line in path.read_text(encoding="utf-8").splitlines()
+        if (json.loads(line)["model"], json.loads(line)["pk"]) not in dropped
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    clear_content()
+
+    out = StringIO()
+    call_command("blog_import", str(path), stdout=out)
+    assert not Comment.objects.exists(), (
+        "Убедитесь, что комментарии к отсутствующему посту пропускаются."
+    )
+    assert not Post.objects.exclude(location=None).exists(), (
+        "Убедитесь, что ссылка на отсутствующую локацию обнуляется."
+    )
+    assert Post.objects.count() == 4
+    assert "пропущено из-за отсутствующих связей: 3" in out.getvalue()
+
+
+def test_import_inserts_in_batches(tmp_path, mixer: Mixer, user):
+    mixer.cycle(50).blend("blog.Post", author=user, category=None,
+                          location=None)
+    path = tmp_path / "blog.jsonl"
+    export(path)
+    clear_content()
+    with CaptureQueriesContext(connection) as ctx:
+        call_command("blog_import", str(path), batch_size=25,
+                     stdout=StringIO())
+    inserts = [q for q in ctx.captured_queries
+               if q["sql"].startswith('INSERT INTO "blog_post"')]
+    assert len(inserts) <= 3, (
+        "Убедитесь, что посты сохраняются через bulk_create порциями,"
+        " а не по одному."
+    )
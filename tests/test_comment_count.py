@@ -0,0 +1,47 @@
+import pytest
+from django.core.management import call_command
+from mixer.backend.django import Mixer
+
+from blog.models import Comment, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_comment_count_follows_comments(
+    mixer: Mixer, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    for i in range(3):
+        user_client.post(
+            f"/posts/{post.id}/comment/", data={"text": f"Комментарий {i}"}
+        )
+    post.refresh_from_db()
+    assert post.comment_count == 3, (
+        "Убедитесь, что добавление комментария увеличивает счётчик поста."
+    )
+
+    Comment.objects.filter(post=post).first().delete()
+    post.refresh_from_db()
+    assert post.comment_count == 2, (
+        "Убедитесь, что удаление комментария уменьшает счётчик поста."
+    )
+
+    Comment.objects.filter(post=post).delete()
+    post.refresh_from_db()
+    assert post.comment_count == 0
+
+
+def test_recalculate_counters_repairs_drift(
+    mixer: Mixer, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(4).blend("blog.Comment", post=post)
+    Post.objects.filter(pk=post.pk).update(comment_count=42)
+
+    call_command("recalculate_counters", verbosity=0)
+
+    post.refresh_from_db()
+    assert post.comment_count == 4, (
+        "Убедитесь, что команда recalculate_counters пересчитывает счётчики"
+        " комментариев."
+    )
@@ -0,0 +1,69 @@
+from http import HTTPStatus
+
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.mark.parametrize("page", ["index", "detail", "profile", "category"])
+def test_not_modified_without_rendering(
+    page, user, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    url = {
+        "index": "/",
+        "detail": f"/posts/{post.id}/",
+        "profile": f"/profile/{user.username}/",
+        "category": f"/category/{post.category.slug}/",
+    }[page]
+    response = user_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    etag = response.get("ETag")
+    assert etag and response.get("Last-Modified"), (
+        f"Убедитесь, что страница `{url}` отдаёт ETag и Last-Modified."
+    )
+
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+        f"Убедитесь, что страница `{url}` отвечает 304 на совпавший ETag."
+    )
+    assert not response.templates
+
+    user_client.post(f"/posts/{post.id}/comment/", data={"text": "Новый"})
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK, (
+        f"Убедитесь, что новый комментарий меняет ETag страницы `{url}`."
+    )
+
+
+def test_anonymous_cached_page_not_modified(
+    client, post_with_published_location
+):
+    etag = client.get("/").get("ETag")
+    client.get("/")
+    response = client.get("/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+@pytest.mark.parametrize("change", ["category", "location", "username"])
+def test_related_changes_update_validators(
+    change, user, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    response = user_client.get(url)
+    etag = response["ETag"]
+    if change == "category":
+        post.category.title = "Новое название"
+        post.category.save()
+    elif change == "location":
+        post.location.name = "Новое место"
+        post.location.save()
+    else:
+        user.username = "renamed"
+        user.save()
+    response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK, (
+        "Убедитесь, что изменение категории, локации или имени автора"
+        " меняет ETag страницы поста."
+    )
@@ -0,0 +1,178 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+from blog.cache import get_feed_version, get_post_card_key
+
+pytestmark = [pytest.mark.django_db]
+
+
+def _index_ids(client):
+    response = client.get("/")
+    return {post.id for post in response.context["page_obj"]}
+
+
+def test_scheduled_post_appears_without_restart(
+    mixer: Mixer, user_client, user, published_category
+):
+    now = timezone.now()
+    visible = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=now - timedelta(days=2),
+    )
+    scheduled = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=now + timedelta(days=2),
+    )
+    assert _index_ids(user_client) == {visible.id}
+
+    later = now + timedelta(days=4)
+    with mock.patch("django.utils.timezone.now", return_value=later):
+        assert _index_ids(user_client) == {visible.id, scheduled.id}, (
+            "Убедитесь, что отложенный пост появляется на главной странице"
+            " после наступления даты публикации без перезапуска сервера."
+        )
+
+
+def test_index_first_page_served_from_cache(
+    mixer: Mixer, user_client, user, published_category
+):
+    mixer.cycle(3).blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() - timedelta(days=1),
+    )
+    user_client.get("/")
+    with CaptureQueriesContext(connection) as ctx:
+        user_client.get("/")
+    sql = " ".join(query["sql"] for query in ctx.captured_queries)
+    assert '"blog_post"."title"' not in sql and "COUNT(*)" not in sql, (
+        "Убедитесь, что первые страницы ленты берутся из кэша."
+    )
+
+    new_post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() - timedelta(days=1),
+    )
+    assert new_post.id in _index_ids(user_client), (
+        "Убедитесь, что кэш ленты сбрасывается при сохранении поста."
+    )
+
+
+def test_post_card_cache_follows_category(
+    mixer: Mixer, client, user, published_category
+):
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() - timedelta(days=1),
+    )
+    client.get("/")
+    post.refresh_from_db()
+    key = get_post_card_key(post.id, post.updated_at, post.comment_count,
+                            post.author.username)
+    assert cache.get(key), "Убедитесь, что карточка поста кэшируется."
+
+    published_category.title = "Переименованная категория"
+    published_category.save()
+    content = client.get("/").content.decode("utf-8")
+    assert "Переименованная категория" in content, (
+        "Убедитесь, что кэш карточек сбрасывается при изменении категории."
+    )
+
+
+def test_post_card_cache_follows_author_name(
+    mixer: Mixer, client, user, published_category
+):
+    mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() - timedelta(days=1),
+    )
+    client.get("/")
+    user.username = "renamed_author"
+    user.save()
+    content = client.get("/").content.decode("utf-8")
+    assert "@renamed_author" in content and "/profile/renamed_author/" in (
+        content
+    ), "Убедитесь, что карточка поста обновляется при смене имени автора."
+
+
+def test_user_save_skips_username_lookup(client, user, django_user_model):
+    loaded = django_user_model.objects.get(pk=user.pk)
+    with CaptureQueriesContext(connection) as ctx:
+        client.force_login(loaded)
+        loaded.first_name = "Имя"
+        loaded.save()
+    lookups = [q["sql"] for q in ctx.captured_queries
+               if q["sql"].startswith("SELECT") and "auth_user" in q["sql"]]
+    assert not lookups, (
+        "Убедитесь, что сохранение пользователя не перечитывает его имя"
+        " из базы, если оно не могло измениться."
+    )
+    version = get_feed_version()
+    loaded.username = "renamed_again"
+    loaded.save()
+    assert get_feed_version() != version
+
+
+def test_comment_keeps_feed_counts_cached(
+    mixer: Mixer, user, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    user_client.get("/")
+    version = get_feed_version()
+    user_client.post(f"/posts/{post.id}/comment/", data={"text": "Новый"})
+    assert get_feed_version() == version, (
+        "Убедитесь, что комментарий не сбрасывает кэш ленты целиком."
+    )
+    with CaptureQueriesContext(connection) as ctx:
+        response = user_client.get("/")
+    assert not [q for q in ctx.captured_queries
+                if "COUNT(" in q["sql"]], (
+        "Убедитесь, что после комментария число постов ленты берётся"
+        " из кэша."
+    )
+    assert "Комментарии (1)" in response.content.decode("utf-8"), (
+        "Убедитесь, что счётчик комментариев в ленте обновляется."
+    )
+
+
+def test_anonymous_pages_cached_and_purged(
+    mixer: Mixer, client, user, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    urls = [
+        "/",
+        f"/posts/{post.id}/",
+        f"/profile/{user.username}/",
+        f"/category/{post.category.slug}/",
+    ]
+    for url in urls:
+        client.get(url)
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.context is None, (
+            f"Убедитесь, что страница `{url}` для анонимного посетителя"
+            " отдаётся из кэша."
+        )
+
+    user_client.post(
+        f"/posts/{post.id}/comment/", data={"text": "Новый комментарий"}
+    )
+    for url in urls:
+        response = client.get(url)
+        assert response.context is not None, (
+            f"Убедитесь, что комментарий сбрасывает кэш страницы `{url}`."
+        )
+
+
+def test_logged_in_pages_not_cached(user_client, post_with_published_location):
+    user_client.get("/")
+    response = user_client.get("/")
+    assert response.context is not None, (
+        "Убедитесь, что страницы авторизованных пользователей не кэшируются."
+    )
@@ -0,0 +1,130 @@
+import json
+import os
+import struct
+import subprocess
+import sys
+import zlib
+from http import HTTPStatus
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+
+from blog.forms import PostImageField
+
+pytestmark = [pytest.mark.django_db]
+
+BLOGICUM_DIR = Path(__file__).resolve().parent.parent / "blogicum"
+
+
+def make_jpeg(size, name="photo.jpg"):
+    buffer = BytesIO()
+    Image.new("RGB", size, color=(73, 109, 137)).save(buffer, "JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/jpeg")
+
+
+def make_png_header(width, height, name="huge.png"):
+    """PNG 1×1, в заголовке которого записаны другие размеры.
+
+    Декодировать такой файл невозможно, поэтому проверка по нему
+    показывает, что форма смотрит только на заголовок.
+    """
+    buffer = BytesIO()
+    Image.new("RGB", (1, 1)).save(buffer, "PNG")
+    data = bytearray(buffer.getvalue())
+    ihdr = struct.pack(">II", width, height) + data[24:29]
+    data[16:29] = ihdr
+    data[29:33] = struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    return SimpleUploadedFile(name, bytes(data), "image/png")
+
+
+@pytest.mark.parametrize("size", [(5000, 5000), (60000, 60000)])
+def test_huge_dimensions_rejected_by_header(size):
+    field = PostImageField(required=False)
+    with pytest.raises(ValidationError) as exc_info:
+        field.clean(make_png_header(*size))
+    assert exc_info.value.code == "image_too_large", (
+        "Убедитесь, что изображения с огромными размерами отклоняются"
+        " по заголовку файла."
+    )
+
+
+@override_settings(BLOG_IMAGE_MAX_UPLOAD_SIZE=1024)
+def test_large_file_rejected():
+    field = PostImageField(required=False)
+    with pytest.raises(ValidationError) as exc_info:
+        field.clean(make_jpeg((300, 300)))
+    assert exc_info.value.code == "file_too_large"
+
+
+def test_oversize_image_downscaled():
+    cleaned = PostImageField(required=False).clean(make_jpeg((4000, 3000)))
+    with Image.open(cleaned) as image:
+        assert image.size == (2560, 1920), (
+            "Убедитесь, что слишком большие изображения уменьшаются"
+            " до BLOG_IMAGE_MAX_SIDE."
+        )
+
+
+@override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+def test_upload_streamed_to_temp_file(
+    media_root, user_client, published_category, PostModel
+):
+    response = user_client.post(
+        "/posts/create/",
+        data={
+            "title": "Большое фото",
+            "text": "Текст",
+            "pub_date": "2020-01-01 00:00",
+            "category": published_category.id,
+            "is_published": True,
+            "image": make_jpeg((4000, 3000)),
+        },
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    post = PostModel.objects.get(title="Большое фото")
+    with Image.open(media_root / post.image.name) as image:
+        assert image.size == (2560, 1920)
+
+
+MEMORY_SCRIPT = """
+import json, os, resource, sys
+import django
+django.setup()
+from django.core.files.uploadedfile import UploadedFile
+from blog.forms import PostImageField
+
+path = sys.argv[1]
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+with open(path, "rb") as fh:
+    upload = UploadedFile(fh, "big.jpg", "image/jpeg", os.path.getsize(path))
+    cleaned = PostImageField(required=False).clean(upload)
+    cleaned.seek(0)
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({"peak_kb": after - before}))
+"""
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="нужен модуль resource")
+def test_memory_ceiling_for_large_jpeg(tmp_path):
+    # 48 мегапикселей: Pillow хранит пиксель в 4 байтах, поэтому полное
+    # декодирование заняло бы ~190 МБ, а кадр в половинном масштабе — ~50
+    path = tmp_path / "big.jpg"
+    Image.new("RGB", (8000, 6000), color=(200, 120, 40)).save(path, "JPEG")
+    result = subprocess.run(
+        [sys.executable, "-c", MEMORY_SCRIPT, str(path)],
+        cwd=BLOGICUM_DIR,
+        env={**os.environ, "DJANGO_SETTINGS_MODULE": "blogicum.settings"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    peak_mb = json.loads(result.stdout)["peak_kb"] / 1024
+    assert peak_mb < 128, (
+        "Убедитесь, что проверка и уменьшение большого JPEG не декодируют"
+        f" его целиком: пик памяти вырос на {peak_mb:.0f} МБ."
+    )
@@ -0,0 +1,219 @@
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.images import ImageFile
+from django.core.management import call_command
+from mixer.backend.django import Mixer
+from PIL import Image
+
+from blog.images import get_rendition_name
+from blog.jobs import claim_next_job
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def post_with_large_image(
+    media_root, mixer: Mixer, user, published_location, published_category
+):
+    img = Image.new("RGB", (2000, 1000), color=(73, 109, 137))
+    img_io = BytesIO()
+    img.save(img_io, format="JPEG")
+    post = mixer.blend(
+        "blog.Post",
+        is_published=True,
+        location=published_location,
+        category=published_category,
+        author=user,
+        image=ImageFile(img_io, name="large.jpg"),
+    )
+    call_command("run_image_worker", once=True, verbosity=0)
+    post.refresh_from_db()
+    return post
+
+
+def test_renditions_created_by_worker(media_root, post_with_large_image):
+    name = post_with_large_image.image.name
+    for width in (640, 1280):
+        for ext in ("jpg", "webp"):
+            path = media_root / get_rendition_name(name, width, ext)
+            assert path.exists(), (
+                f"Убедитесь, что при загрузке создаётся копия {width}w.{ext}."
+            )
+            with Image.open(path) as rendition:
+                assert rendition.width == width
+
+
+def test_srcset_on_feed_and_detail(user_client, post_with_large_image):
+    post = post_with_large_image
+    for url in ("/", f"/posts/{post.id}/"):
+        content = user_client.get(url).content.decode("utf-8")
+        assert 'type="image/webp"' in content
+        assert ".1280w.jpg 1280w" in content, (
+            f"Убедитесь, что на странице `{url}` у изображения есть srcset."
+        )
+
+
+def test_backfill_command(media_root, post_with_large_image):
+    name = post_with_large_image.image.name
+    webp = media_root / get_rendition_name(name, 640, "webp")
+    webp.unlink()
+    call_command("generate_post_images", verbosity=0)
+    assert webp.exists(), (
+        "Убедитесь, что команда generate_post_images создаёт недостающие"
+        " копии."
+    )
+
+
+def test_saving_post_keeps_image_jobs(post_with_large_image):
+    post = post_with_large_image
+    post.title = "Новый заголовок"
+    post.save()
+    assert post.image_jobs.count() == 1, (
+        "Убедитесь, что изображение обрабатывается заново, только если"
+        " его заменили."
+    )
+
+
+def test_backfill_survives_broken_image(
+    media_root, post_with_large_image, monkeypatch
+):
+    def broken(image, force=False):
+        raise Image.DecompressionBombError("слишком много пикселей")
+
+    monkeypatch.setattr(
+        "blog.management.commands.generate_post_images.generate_renditions",
+        broken,
+    )
+    out, err = StringIO(), StringIO()
+    call_command("generate_post_images", stdout=out, stderr=err)
+    assert "ошибок: 1" in out.getvalue(), (
+        "Убедитесь, что generate_post_images не падает на битом"
+        " изображении, а считает его ошибкой."
+    )
+    assert "пикселей" in err.getvalue()
+
+
+def test_worker_strips_exif_and_fixes_orientation(
+    media_root, mixer: Mixer, user_client, user, published_category,
+    django_capture_on_commit_callbacks,
+):
+    img = Image.new("RGB", (300, 200), color=(200, 10, 10))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: повернуть на 90° по часовой
+    exif[0x010F] = "Secret Camera"
+    img_io = BytesIO()
+    img.save(img_io, format="JPEG", exif=exif)
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, image=ImageFile(img_io, name="exif.jpg"),
+    )
+    post.refresh_from_db()
+    raw_name = post.image.name
+    assert not post.image_ready
+    content = user_client.get(f"/posts/{post.id}/").content.decode("utf-8")
+    assert "image-processing.svg" in content, (
+        "Убедитесь, что до обработки изображения показывается заглушка."
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("run_image_worker", once=True, verbosity=0)
+
+    post.refresh_from_db()
+    assert post.image_ready
+    assert post.image_jobs.get().status == "done"
+    with Image.open(media_root / post.image.name) as cleaned:
+        assert cleaned.size == (200, 300), (
+            "Убедитесь, что изображение поворачивается по EXIF."
+        )
+        assert not cleaned.getexif(), (
+            "Убедитесь, что из изображения удаляются EXIF-метаданные."
+        )
+    assert not (media_root / raw_name).exists(), (
+        "Убедитесь, что исходный файл с метаданными удаляется."
+    )
+
+
+def test_worker_survives_unexpected_errors(
+    media_root, mixer: Mixer, user, monkeypatch
+):
+    img_io = BytesIO()
+    Image.new("RGB", (10, 10)).save(img_io, format="JPEG")
+    post = mixer.blend("blog.Post", author=user,
+                       image=ImageFile(img_io, name="bad.jpg"))
+
+    def broken(post):
+        raise Image.DecompressionBombError("слишком много пикселей")
+
+    monkeypatch.setattr("blog.jobs.clean_image", broken)
+    monkeypatch.setattr("blog.jobs.RETRY_DELAY", timedelta(0))
+    for _ in range(3):
+        call_command("run_image_worker", once=True, verbosity=0)
+    job = post.image_jobs.get()
+    assert job.status == job.Status.FAILED, (
+        "Убедитесь, что ошибка обработки изображения любого типа"
+        " записывается в задание, а не роняет обработчик."
+    )
+    assert job.attempts == 3
+    assert "пикселей" in job.error
+
+
+def test_failed_job_retried_with_backoff(
+    media_root, mixer: Mixer, user, monkeypatch,
+    django_capture_on_commit_callbacks,
+):
+    img_io = BytesIO()
+    Image.new("RGB", (10, 10)).save(img_io, format="JPEG")
+    post = mixer.blend("blog.Post", author=user,
+                       image=ImageFile(img_io, name="bad.jpg"))
+
+    def broken(image):
+        raise OSError("диск недоступен")
+
+    monkeypatch.setattr("blog.jobs.generate_renditions", broken)
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command("run_image_worker", once=True, verbosity=0)
+    job = post.image_jobs.get()
+    assert job.status == job.Status.PENDING and job.run_after, (
+        "Убедитесь, что после ошибки задание откладывается, а не"
+        " повторяется сразу."
+    )
+    assert claim_next_job() is None
+    post.refresh_from_db()
+    files = {path.name for path in media_root.rglob("*") if path.is_file()}
+    assert files == {post.image.name.rsplit("/", 1)[-1]}, (
+        "Убедитесь, что очищенная копия удаляется, если обработка упала."
+    )
+
+
+def test_exhausted_attempts_drop_image(
+    media_root, mixer: Mixer, user, user_client, published_category,
+    monkeypatch, django_capture_on_commit_callbacks,
+):
+    img_io = BytesIO()
+    Image.new("RGB", (10, 10)).save(img_io, format="JPEG")
+    post = mixer.blend("blog.Post", author=user, is_published=True,
+                       category=published_category,
+                       image=ImageFile(img_io, name="bad.jpg"))
+    post.refresh_from_db()
+    raw_name = post.image.name
+
+    def broken(post):
+        raise ValueError("битый файл")
+
+    monkeypatch.setattr("blog.jobs.clean_image", broken)
+    monkeypatch.setattr("blog.jobs.RETRY_DELAY", timedelta(0))
+    with django_capture_on_commit_callbacks(execute=True):
+        for _ in range(3):
+            call_command("run_image_worker", once=True, verbosity=0)
+    post.refresh_from_db()
+    assert post.image_ready and not post.image, (
+        "Убедитесь, что после последней неудачной попытки пост перестаёт"
+        " показывать заглушку."
+    )
+    content = user_client.get(f"/posts/{post.id}/").content.decode("utf-8")
+    assert "image-processing.svg" not in content
+    assert not (media_root / raw_name).exists(), (
+        "Убедитесь, что необработанный файл с метаданными удаляется."
+    )
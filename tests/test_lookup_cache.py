@@ -0,0 +1,113 @@
+import re
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def feed_post(mixer: Mixer, user, published_category, published_location):
+    return mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        location=published_location, is_published=True,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+
+
+def get_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    return response, [query["sql"] for query in ctx.captured_queries]
+
+
+def test_category_page_skips_category_query(
+    user_client, published_category, feed_post
+):
+    url = f"/category/{published_category.slug}/"
+    user_client.get(url)
+    response, queries = get_queries(user_client, url)
+    assert response.status_code == HTTPStatus.OK
+    assert not [sql for sql in queries
+                if re.search(r'FROM "blog_category" WHERE', sql)], (
+        "Убедитесь, что категория по slug берётся из кэша."
+    )
+
+
+def test_category_changes_invalidate_cache(
+    user_client, published_category, feed_post
+):
+    old_url = f"/category/{published_category.slug}/"
+    assert user_client.get(old_url).status_code == HTTPStatus.OK
+
+    published_category.slug = "new-slug"
+    published_category.save()
+    assert user_client.get(old_url).status_code == HTTPStatus.NOT_FOUND, (
+        "Убедитесь, что после смены slug старый адрес категории не работает."
+    )
+    assert user_client.get("/category/new-slug/").status_code == (
+        HTTPStatus.OK
+    )
+
+    published_category.is_published = False
+    published_category.save()
+    assert user_client.get("/category/new-slug/").status_code == (
+        HTTPStatus.NOT_FOUND
+    ), "Убедитесь, что снятая с публикации категория сразу даёт 404."
+
+
+def test_feed_does_not_join_locations(
+    user_client, published_location, feed_post
+):
+    response, queries = get_queries(user_client, "/")
+    assert published_location.name in response.content.decode("utf-8")
+    assert not [sql for sql in queries if 'JOIN "blog_location"' in sql], (
+        "Убедитесь, что лента не присоединяет локации: они берутся из кэша."
+    )
+
+    published_location.name = "Новое место"
+    published_location.save()
+    content = user_client.get("/").content.decode("utf-8")
+    assert "Новое место" in content, (
+        "Убедитесь, что изменение локации сбрасывает её кэш."
+    )
+
+
+def test_unknown_slugs_not_kept_in_memory(client, monkeypatch, mixer: Mixer):
+    from django.core.cache import cache
+
+    from blog import cache as blog_cache
+
+    for number in range(5):
+        assert client.get(f"/category/missing-{number}/").status_code == (
+            HTTPStatus.NOT_FOUND
+        )
+    assert not blog_cache._local_lookups, (
+        "Убедитесь, что несуществующие slug не копятся в памяти процесса."
+    )
+    timeouts = {}
+    original_set = cache.set
+
+    def recording_set(key, value, timeout=None, **kwargs):
+        timeouts[key] = timeout
+        original_set(key, value, timeout, **kwargs)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(cache, "set", recording_set)
+        client.get("/category/missing-again/")
+    assert timeouts[blog_cache.get_category_key("missing-again")] == (
+        blog_cache.LOOKUP_MISS_TIMEOUT
+    ), "Убедитесь, что промахи хранятся в общем кэше недолго."
+
+    monkeypatch.setattr(blog_cache, "LOCAL_LOOKUP_MAX_SIZE", 3)
+    for category in mixer.cycle(5).blend("blog.Category"):
+        blog_cache.get_cached_category(category.slug)
+    assert len(blog_cache._local_lookups) == 3, (
+        "Убедитесь, что память процесса хранит ограниченное число"
+        " справочников."
+    )
@@ -0,0 +1,85 @@
+from http import HTTPStatus
+
+import pytest
+from django.test import override_settings
+
+DATA = bytes(range(256)) * 40
+URL = "/media/posts_images/file.bin"
+
+
+@pytest.fixture
+def media_file(media_root):
+    path = media_root / "posts_images" / "file.bin"
+    path.parent.mkdir()
+    path.write_bytes(DATA)
+    return path
+
+
+def test_full_response(client, media_file):
+    response = client.get(URL)
+    assert response.status_code == HTTPStatus.OK
+    assert b"".join(response.streaming_content) == DATA
+    assert response["Content-Length"] == str(len(DATA))
+    assert response["Accept-Ranges"] == "bytes"
+    assert "max-age=86400" in response["Cache-Control"]
+    assert response.get("ETag") and response.get("Last-Modified")
+
+
+def test_conditional_get(client, media_file):
+    etag = client.get(URL)["ETag"]
+    response = client.get(URL, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+        "Убедитесь, что медиафайлы отвечают 304 на совпавший ETag."
+    )
+
+
+@pytest.mark.parametrize(
+    "header, start, end",
+    [("bytes=10-19", 10, 19), ("bytes=-100", len(DATA) - 100, len(DATA) - 1),
+     ("bytes=10000-", 10000, len(DATA) - 1)],
+)
+def test_range_request(client, media_file, header, start, end):
+    response = client.get(URL, HTTP_RANGE=header)
+    assert response.status_code == HTTPStatus.PARTIAL_CONTENT, (
+        "Убедитесь, что медиафайлы поддерживают запросы с Range."
+    )
+    assert b"".join(response.streaming_content) == DATA[start:end + 1]
+    assert response["Content-Range"] == f"bytes {start}-{end}/{len(DATA)}"
+    assert response["Content-Length"] == str(end - start + 1)
+
+
+def test_unsatisfiable_range(client, media_file):
+    response = client.get(URL, HTTP_RANGE=f"bytes={len(DATA)}-")
+    assert response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response["Content-Range"] == f"bytes */{len(DATA)}"
+
+
+def test_stale_if_range_returns_full_file(client, media_file):
+    response = client.get(
+        URL, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"'
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.parametrize(
+    "backend, header, value",
+    [("x-accel-redirect", "X-Accel-Redirect",
+      "/_protected_media/posts_images/file.bin"),
+     ("x-sendfile", "X-Sendfile", None)],
+)
+def test_sendfile_offload(client, media_file, backend, header, value):
+    with override_settings(BLOG_MEDIA_SENDFILE=backend):
+        response = client.get(URL)
+    assert response.status_code == HTTPStatus.OK
+    assert response[header] == (value or str(media_file)), (
+        f"Убедитесь, что при BLOG_MEDIA_SENDFILE={backend} передача"
+        f" файла отдаётся фронт-серверу через {header}."
+    )
+    assert not response.content
+
+
+@pytest.mark.parametrize(
+    "url", ["/media/../settings.py", "/media/posts_images/"]
+)
+def test_missing_files(client, media_file, url):
+    assert client.get(url).status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,143 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from mixer.backend.django import Mixer
+from PIL import Image
+
+from blog.images import get_rendition_name
+from blog.media import delete_orphan
+from blog.models import MediaFile
+from blog.storage import ContentAddressedStorage
+
+pytestmark = [pytest.mark.django_db]
+
+
+def jpeg_bytes(color=(73, 109, 137), size=(1400, 700)):
+    buffer = BytesIO()
+    Image.new("RGB", size, color=color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def make_post(mixer: Mixer, user, published_category):
+    def make_post(data, name="photo.jpg"):
+        return mixer.blend(
+            "blog.Post", author=user, category=published_category,
+            is_published=True, image=ContentFile(data, name=name),
+        )
+    return make_post
+
+
+def process_images(capture):
+    with capture(execute=True):
+        call_command("run_image_worker", once=True, verbosity=0)
+
+
+def test_identical_uploads_share_one_file(
+    media_root, make_post, django_capture_on_commit_callbacks
+):
+    data = jpeg_bytes()
+    first, second = make_post(data, "a.jpg"), make_post(data, "b.jpg")
+    assert first.image.name == second.image.name, (
+        "Убедитесь, что одинаковые загрузки сохраняются в один файл."
+    )
+    process_images(django_capture_on_commit_callbacks)
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert first.image.name == second.image.name
+    files = [p for p in (media_root / "posts_images").rglob("*.jpg")
+             if "w." not in p.name]
+    assert files == [media_root / first.image.name], (
+        "Убедитесь, что после обработки остаётся один файл на содержимое."
+    )
+
+
+def test_cleanup_does_not_delete_reused_file(
+    media_root, make_post, monkeypatch
+):
+    data = jpeg_bytes()
+    first = make_post(data)
+    name = first.image.name
+    first.delete()
+
+    save = ContentAddressedStorage._save
+
+    def save_then_cleanup(self, name, content):
+        saved = save(self, name, content)
+        # Уборка сироты успевает между записью файла и сохранением поста
+        delete_orphan(saved)
+        return saved
+
+    monkeypatch.setattr(ContentAddressedStorage, "_save", save_then_cleanup)
+    second = make_post(data)
+    assert second.image.name == name
+    assert (media_root / name).exists(), (
+        "Убедитесь, что файл, который повторно загружают, не удаляется"
+        " вместе с последней старой ссылкой."
+    )
+    assert MediaFile.objects.get(name=name).ref_count == 1, (
+        "Убедитесь, что загрузка файла добавляет ровно одну ссылку."
+    )
+
+
+def test_file_deleted_with_last_reference(
+    media_root, make_post, django_capture_on_commit_callbacks
+):
+    data = jpeg_bytes()
+    first, second = make_post(data), make_post(data)
+    process_images(django_capture_on_commit_callbacks)
+    first.refresh_from_db()
+    second.refresh_from_db()
+    name = first.image.name
+    rendition = media_root / get_rendition_name(name, 640, "webp")
+    assert rendition.exists()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert (media_root / name).exists(), (
+        "Убедитесь, что файл не удаляется, пока на него ссылается"
+        " другой пост."
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        second.delete()
+    assert not (media_root / name).exists(), (
+        "Убедитесь, что файл удаляется вместе с последним постом."
+    )
+    assert not rendition.exists()
+
+
+def test_replaced_image_released(
+    media_root, make_post, django_capture_on_commit_callbacks
+):
+    post = make_post(jpeg_bytes())
+    process_images(django_capture_on_commit_callbacks)
+    post.refresh_from_db()
+    old_name = post.image.name
+
+    with django_capture_on_commit_callbacks(execute=True):
+        post.image = ContentFile(jpeg_bytes(color=(10, 200, 10)), "new.jpg")
+        post.save()
+    assert not (media_root / old_name).exists(), (
+        "Убедитесь, что при замене изображения старый файл удаляется."
+    )
+
+
+def test_hashed_urls_cached_forever(
+    client, media_root, make_post, django_capture_on_commit_callbacks
+):
+    post = make_post(jpeg_bytes())
+    process_images(django_capture_on_commit_callbacks)
+    post.refresh_from_db()
+    response = client.get(post.image.url)
+    assert response.status_code == 200
+    cache_control = response.get("Cache-Control", "")
+    assert "immutable" in cache_control and "max-age=31536000" in (
+        cache_control
+    ), "Убедитесь, что файлы с хешем в имени отдаются с immutable."
+
+    (media_root / "legacy.jpg").write_bytes(jpeg_bytes())
+    response = client.get("/media/legacy.jpg")
+    assert "immutable" not in response.get("Cache-Control", "")
@@ -0,0 +1,190 @@
+import json
+import multiprocessing
+import re
+
+import pytest
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import override_settings
+
+from blog import metrics
+from blog.middleware import MetricsMiddleware
+from blog.models import Comment
+
+pytestmark = [pytest.mark.django_db]
+
+SAMPLE_RE = re.compile(r'^([a-z_]+)(\{.*\})? (\S+)$')
+
+
+@pytest.fixture
+def fresh_store(monkeypatch):
+    """Пустое хранилище процесса на время теста."""
+    monkeypatch.setattr(metrics, "_store", None)
+    monkeypatch.setattr(metrics, "_store_pid", None)
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, fresh_store):
+    with override_settings(BLOG_METRICS_DIR=str(tmp_path)):
+        yield tmp_path
+
+
+def get_samples(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4"), (
+        "Убедитесь, что /metrics отдаёт текстовый формат Prometheus."
+    )
+    samples = {}
+    for line in response.content.decode().splitlines():
+        if line.startswith("#"):
+            continue
+        match = SAMPLE_RE.match(line)
+        assert match, f"Строка `{line}` не в формате Prometheus."
+        name, labels, value = match.groups()
+        samples[name + (labels or "")] = float(value)
+    return samples
+
+
+def test_request_counters(client, post_with_published_location, fresh_store):
+    url = f"/posts/{post_with_published_location.id}/"
+    client.get(url)
+    client.get(url)
+    client.get("/no-such-page/")
+    samples = get_samples(client)
+    key = ('blog_http_requests_total'
+           '{method="GET",status="200",view="blog:post_detail"}')
+    assert samples.get(key) == 2, (
+        "Убедитесь, что запросы считаются по имени URL, методу и статусу."
+    )
+    assert samples.get(
+        'blog_http_requests_total'
+        '{method="GET",status="404",view="unmatched"}'
+    ) == 1, "Убедитесь, что несовпавшие адреса не дробятся по пути."
+    assert samples[
+        'blog_http_request_duration_seconds_count{view="blog:post_detail"}'
+    ] == 2
+    assert samples[
+        'blog_db_queries_per_request_sum{view="blog:post_detail"}'
+    ] > 0, "Убедитесь, что считаются SQL-запросы на один запрос."
+
+
+def test_histogram_buckets_cumulative(client, fresh_store):
+    histogram = metrics.UPLOAD_SIZE
+    for size in (5_000, 50_000, 50_000, 20_000_000):
+        histogram.observe(size)
+    samples = get_samples(client)
+    buckets = [
+        samples[f'blog_upload_size_bytes_bucket{{le="{bound}"}}']
+        for bound in ("10000.0", "100000.0", "10000000.0", "+Inf")
+    ]
+    assert buckets == [1, 3, 3, 4], (
+        "Убедитесь, что корзины гистограммы накопительные."
+    )
+    assert samples["blog_upload_size_bytes_count"] == 4
+    assert samples["blog_upload_size_bytes_sum"] == 20_105_000
+
+
+def test_cache_counters(client, post_with_published_location, fresh_store):
+    url = f"/posts/{post_with_published_location.id}/"
+    client.get(url)
+    client.get(url)
+    samples = get_samples(client)
+    hits = sum(value for key, value in samples.items()
+               if key.startswith("blog_cache_requests_total")
+               and 'result="hit"' in key)
+    misses = sum(value for key, value in samples.items()
+                 if key.startswith("blog_cache_requests_total")
+                 and 'result="miss"' in key)
+    assert hits and misses, (
+        "Убедитесь, что обращения к кэшам считаются как hit и miss."
+    )
+
+
+def test_created_counters(client, user, post_with_published_location,
+                          fresh_store, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        Comment.objects.create(post=post_with_published_location,
+                               author=user, text="Комментарий")
+    samples = get_samples(client)
+    assert samples["blog_comments_created_total"] == 1, (
+        "Убедитесь, что созданные комментарии считаются после коммита."
+    )
+    assert "blog_posts_created_total" not in samples
+
+
+def test_metrics_disabled(client):
+    with override_settings(BLOG_METRICS_ENABLED=False):
+        assert client.get("/metrics").status_code == 404
+        with pytest.raises(MiddlewareNotUsed):
+            MetricsMiddleware(lambda request: HttpResponse())
+
+
+@override_settings(BLOG_METRICS_ALLOWED_IPS=["10.1.0.0/16"],
+                   BLOG_METRICS_TOKEN="secret")
+def test_metrics_access_restricted(client):
+    assert client.get("/metrics").status_code == 403, (
+        "Убедитесь, что /metrics не отдаётся произвольным клиентам."
+    )
+    assert client.get("/metrics", REMOTE_ADDR="10.1.2.3").status_code == 200
+    assert client.get(
+        "/metrics", HTTP_AUTHORIZATION="Bearer wrong"
+    ).status_code == 403
+    assert client.get(
+        "/metrics", HTTP_AUTHORIZATION="Bearer secret"
+    ).status_code == 200, "Убедитесь, что метрики отдаются по токену."
+
+
+def test_clear_directory(metrics_dir):
+    metrics.POSTS_CREATED.inc()
+    (metrics_dir / "other.txt").write_text("")
+    metrics.clear_directory(str(metrics_dir))
+    assert [path.name for path in metrics_dir.iterdir()] == ["other.txt"]
+
+
+def test_label_escaping():
+    assert metrics.format_labels([("view", 'a"b\\c\nd')]) == (
+        '{view="a\\"b\\\\c\\nd"}'
+    )
+
+
+def increment_in_child(directory, amount):
+    with override_settings(BLOG_METRICS_DIR=directory):
+        metrics._store_pid = None
+        metrics.POSTS_CREATED.inc(amount)
+
+
+def test_multiprocess_values_summed(client, metrics_dir):
+    metrics.POSTS_CREATED.inc(2)
+    context = multiprocessing.get_context("fork")
+    for amount in (3, 4):
+        process = context.Process(target=increment_in_child,
+                                  args=(str(metrics_dir), amount))
+        process.start()
+        process.join()
+        assert process.exitcode == 0
+    assert len(list(metrics_dir.glob("metrics_*.db"))) == 3, (
+        "Убедитесь, что каждый процесс пишет метрики в свой файл."
+    )
+    assert get_samples(client)["blog_posts_created_total"] == 9, (
+        "Убедитесь, что /metrics складывает значения всех процессов."
+    )
+
+
+def test_mmap_store_grows_and_reopens(metrics_dir):
+    path = str(metrics_dir / "metrics_1.db")
+    store = metrics.MmapStore(path)
+    keys = [json.dumps(["m", "m", [["n", "x" * 100 + str(number)]]])
+            for number in range(1000)]
+    for key in keys:
+        store.inc(key, 1.5)
+    store.inc(keys[0], 1)
+    assert len(store.map) > metrics.INITIAL_FILE_SIZE
+    values = dict(metrics.read_file(path))
+    assert len(values) == 1000
+    assert values[keys[0]] == 2.5
+    reopened = metrics.MmapStore(path)
+    reopened.inc(keys[-1], 1)
+    assert dict(reopened.items())[keys[-1]] == 2.5, (
+        "Убедитесь, что повторно открытый файл продолжает счёт."
+    )
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+from blog.paginators import encode_cursor
+from conftest import N_PER_PAGE
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def feed_posts(mixer: Mixer, user, published_category):
+    now = timezone.now()
+    pub_dates = (
+        now - timedelta(days=1, minutes=i) for i in range(N_PER_PAGE * 3)
+    )
+    return mixer.cycle(N_PER_PAGE * 3).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        is_published=True,
+        pub_date=pub_dates,
+    )
+
+
+def _walk(client, url, direction):
+    seen = []
+    response = client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    page = response.context["page_obj"]
+    seen.append([post.id for post in page])
+    cursor = getattr(page, f"{direction}_cursor")
+    while cursor:
+        param = "after" if direction == "next" else "before"
+        response = client.get(f"/?{param}={cursor}")
+        assert response.status_code == HTTPStatus.OK
+        page = response.context["page_obj"]
+        seen.append([post.id for post in page])
+        cursor = getattr(page, f"{direction}_cursor")
+    return seen, page
+
+
+def test_keyset_walks_whole_feed(user_client, feed_posts):
+    expected = [
+        post.id
+        for post in sorted(
+            feed_posts, key=lambda p: (p.pub_date, p.id), reverse=True
+        )
+    ]
+    pages = []
+    response = user_client.get("/")
+    page = response.context["page_obj"]
+    pages.append([post.id for post in page])
+    cursor = encode_cursor(page[len(page) - 1])
+    tail, last_page = _walk(user_client, f"/?after={cursor}", "next")
+    pages.extend(tail)
+    walked = [post_id for page_ids in pages for post_id in page_ids]
+    assert walked == expected, (
+        "Убедитесь, что курсорная пагинация проходит ленту без пропусков"
+        " и повторов."
+    )
+    assert not last_page.has_next()
+
+    back, first = _walk(
+        user_client, f"/?before={last_page.previous_cursor}", "previous"
+    )
+    assert back[-1] == expected[:N_PER_PAGE], (
+        "Убедитесь, что ссылка ?before= возвращает к предыдущим страницам."
+    )
+    assert not first.has_previous()
+
+
+def test_offset_pages_still_work(user_client, feed_posts):
+    response = user_client.get("/?page=2")
+    assert response.status_code == HTTPStatus.OK, (
+        "Убедитесь, что старые ссылки вида ?page=N продолжают работать."
+    )
+    assert len(response.context["page_obj"]) == N_PER_PAGE
+
+
+def test_invalid_cursor_is_404(user_client, feed_posts):
+    response = user_client.get("/?after=not-a-cursor")
+    assert response.status_code == HTTPStatus.NOT_FOUND
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+from blog.models import Post
+from blog.views import PostListView
+
+pytestmark = [pytest.mark.django_db]
+
+N_POSTS = 300
+
+
+@pytest.fixture
+def many_posts(user, published_category):
+    now = timezone.now()
+    Post.objects.bulk_create(
+        Post(
+            title=f"Пост {i}", text="Текст", author=user,
+            category=published_category, is_published=True,
+            pub_date=now - timedelta(days=1, minutes=i),
+        )
+        for i in range(N_POSTS)
+    )
+
+
+def test_page_range_is_windowed(monkeypatch, user_client, many_posts):
+    monkeypatch.setattr(PostListView, "offset_pages", None)
+    response = user_client.get("/?page=10")
+    page = response.context["page_obj"]
+    assert page.page_window == [1, "…", 7, 8, 9, 10, 11, 12, 13, "…", 30]
+    content = response.content.decode("utf-8")
+    assert content.count('class="page-item') <= 16, (
+        "Убедитесь, что пагинатор выводит ссылки только на соседние"
+        " страницы, а не на все страницы ленты."
+    )
+    assert "?page=30" in content
+
+
+def test_deep_pages_capped_at_offset_pages(user_client, many_posts):
+    response = user_client.get("/?page=5")
+    content = response.content.decode("utf-8")
+    assert response.context["page_obj"].page_window == [1, 2, 3, 4, 5]
+    assert "?page=6" not in content and "Последняя" not in content, (
+        "Убедитесь, что ссылки на номера страниц не ведут дальше"
+        " offset_pages."
+    )
+    for url in ("/?page=6", "/?page=30", "/?page=last"):
+        with CaptureQueriesContext(connection) as ctx:
+            response = user_client.get(url)
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            "Убедитесь, что глубокие страницы по номеру недоступны."
+        )
+        assert not [q for q in ctx.captured_queries
+                    if "OFFSET" in q["sql"].upper()], (
+            "Убедитесь, что глубокий ?page= не выполняет запрос с OFFSET."
+        )
+
+
+def test_count_cached_until_feed_changes(
+    mixer: Mixer, user, user_client, published_category, many_posts
+):
+    user_client.get("/?page=4")
+    with CaptureQueriesContext(connection) as ctx:
+        response = user_client.get("/?page=4")
+    assert not [q for q in ctx.captured_queries if "COUNT(" in q["sql"]], (
+        "Убедитесь, что число постов ленты берётся из кэша."
+    )
+    assert response.context["paginator"].count == N_POSTS
+
+    mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() - timedelta(hours=1),
+    )
+    response = user_client.get("/?page=4")
+    assert response.context["paginator"].count == N_POSTS + 1, (
+        "Убедитесь, что кэш числа постов сбрасывается при изменении ленты."
+    )
+
+
+@override_settings(BLOG_FEED_APPROXIMATE_COUNT=50)
+def test_approximate_count(user_client, many_posts):
+    response = user_client.get("/?page=5")
+    paginator = response.context["paginator"]
+    assert paginator.count == 50 and paginator.is_approximate
+    page = response.context["page_obj"]
+    assert page.has_next() and page.next_cursor, (
+        "Убедитесь, что за приблизительным концом ленты можно листать"
+        " дальше по курсору."
+    )
+    assert "Последняя" not in response.content.decode("utf-8")
+
+
+def test_exact_count_without_approximation(user_client, many_posts):
+    paginator = user_client.get("/").context["paginator"]
+    assert paginator.count == N_POSTS and not paginator.is_approximate
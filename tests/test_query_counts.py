@@ -0,0 +1,105 @@
+import pytest
+from django.test import override_settings
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_post_detail_query_count(
+    client, django_assert_num_queries, post_with_published_location
+):
+    # Пост вместе с автором, категорией и локацией, затем комментарии
+    url = f"/posts/{post_with_published_location.id}/"
+    with django_assert_num_queries(2):
+        response = client.get(url)
+    assert response.status_code == 200
+
+
+def test_post_detail_query_count_for_author(
+    user_client, django_assert_num_queries, post_with_published_location
+):
+    # Сессия, пользователь, пост и комментарии
+    url = f"/posts/{post_with_published_location.id}/"
+    with django_assert_num_queries(4):
+        response = user_client.get(url)
+    assert response.status_code == 200
+
+
+def test_post_edit_loads_post_once(
+    user_client, django_assert_num_queries, post_with_published_location
+):
+    # Сессия, пользователь, пост и варианты выбора локаций и категорий
+    url = f"/posts/{post_with_published_location.id}/edit/"
+    with django_assert_num_queries(5):
+        response = user_client.get(url)
+    assert response.status_code == 200
+
+
+def test_comment_edit_loads_comment_once(
+    mixer: Mixer, user, user_client, django_assert_num_queries,
+    post_with_published_location,
+):
+    comment = mixer.blend(
+        "blog.Comment", post=post_with_published_location, author=user
+    )
+    # Сессия, пользователь и комментарий
+    url = f"/posts/{comment.post_id}/edit_comment/{comment.id}/"
+    with django_assert_num_queries(3):
+        response = user_client.get(url)
+    assert response.status_code == 200
+
+
+def test_post_detail_with_many_comments(
+    mixer: Mixer, client, django_assert_num_queries,
+    post_with_published_location, CommentModel,
+):
+    post = post_with_published_location
+    authors = mixer.cycle(10).blend("auth.User")
+    CommentModel.objects.bulk_create(
+        CommentModel(post=post, author=authors[i % 10], text=f"Текст {i}")
+        for i in range(500)
+    )
+    url = f"/posts/{post.id}/"
+    with django_assert_num_queries(2):
+        response = client.get(url)
+    assert response.status_code == 200
+    comments = response.context["comments"]
+    assert len(comments) == 50, (
+        "Убедитесь, что на странице поста выводятся последние 50"
+        " комментариев."
+    )
+    assert response.context["has_more_comments"]
+
+    with django_assert_num_queries(2):
+        response = client.get(f"{url}?comments=500")
+    assert len(response.context["comments"]) == 500
+    assert not response.context["has_more_comments"]
+
+
+@override_settings(BLOG_COMMENTS_MAX=200)
+def test_post_detail_comments_limit_bounded(
+    mixer: Mixer, client, post_with_published_location, CommentModel,
+):
+    post = post_with_published_location
+    author = mixer.blend("auth.User")
+    CommentModel.objects.bulk_create(
+        CommentModel(post=post, author=author, text=f"Текст {i}")
+        for i in range(300)
+    )
+    url = f"/posts/{post.id}/"
+    response = client.get(f"{url}?comments=100000000")
+    assert len(response.context["comments"]) == 200, (
+        "Убедитесь, что ?comments= не выводит больше BLOG_COMMENTS_MAX"
+        " комментариев."
+    )
+    assert not response.context["has_more_comments"]
+
+    response = client.get(f"{url}?comments=51")
+    assert len(response.context["comments"]) == 100, (
+        "Убедитесь, что число комментариев округляется до целого окна."
+    )
+    cached = client.get(f"{url}?comments=99")
+    assert cached.context is None, (
+        "Убедитесь, что значения ?comments= с одним окном делят одну"
+        " страницу в кэше."
+    )
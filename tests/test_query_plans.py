@@ -0,0 +1,71 @@
+import re
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+FULL_SCAN_RE = re.compile(
+    r"\bSCAN (blog_post|blog_comment)\b(?! USING (COVERING )?INDEX)"
+)
+
+
+@pytest.fixture
+def feed_data(mixer: Mixer, user, published_category, published_location):
+    posts = mixer.cycle(15).blend(
+        "blog.Post",
+        author=user,
+        category=published_category,
+        location=published_location,
+        is_published=True,
+        pub_date=timezone.now() - timedelta(days=1),
+    )
+    mixer.cycle(5).blend("blog.Comment", post=posts[0], author=user)
+    return posts
+
+
+def _feed_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200
+    return [
+        query["sql"]
+        for query in ctx.captured_queries
+        if re.search(r'FROM "blog_(post|comment)"', query["sql"])
+    ]
+
+
+def _query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+
+@pytest.mark.skipif(
+    connection.vendor != "sqlite", reason="EXPLAIN QUERY PLAN is SQLite-only"
+)
+@pytest.mark.parametrize(
+    "url_name",
+    ["index", "category", "profile", "detail"],
+)
+def test_feed_queries_use_indexes(
+    url_name, client, user, published_category, feed_data
+):
+    url = {
+        "index": "/",
+        "category": f"/category/{published_category.slug}/",
+        "profile": f"/profile/{user.username}/",
+        "detail": f"/posts/{feed_data[0].id}/",
+    }[url_name]
+    queries = _feed_queries(client, url)
+    assert queries
+    for sql in queries:
+        plan = _query_plan(sql)
+        assert not FULL_SCAN_RE.search(plan), (
+            f"Запрос страницы `{url}` выполняет полный просмотр таблицы"
+            f" вместо поиска по индексу:\n{sql}\n{plan}"
+        )
@@ -0,0 +1,93 @@
+import json
+import logging
+import re
+
+import pytest
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from blog.middleware import RequestTimingMiddleware, get_sql_shape
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+SERVER_TIMING_RE = re.compile(
+    r'total;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries, (\d+) duplicates",'
+    r' tpl;dur=([\d.]+)'
+)
+
+
+def test_disabled_middleware_not_used(client, post_with_published_location):
+    with pytest.raises(MiddlewareNotUsed):
+        RequestTimingMiddleware(lambda request: HttpResponse())
+    response = client.get(f"/posts/{post_with_published_location.id}/")
+    assert "Server-Timing" not in response, (
+        "Убедитесь, что при BLOG_TIMING_SAMPLE_RATE = 0 замеры не ведутся."
+    )
+
+
+@override_settings(BLOG_TIMING_SAMPLE_RATE=1.0)
+def test_server_timing_and_log(client, post_with_published_location, caplog):
+    with caplog.at_level(logging.INFO, logger="blog.timing"):
+        response = client.get(f"/posts/{post_with_published_location.id}/")
+    match = SERVER_TIMING_RE.fullmatch(response.get("Server-Timing", ""))
+    assert match, (
+        "Убедитесь, что замеренный запрос получает заголовок Server-Timing"
+        " с общим временем, временем БД и рендеринга."
+    )
+    assert int(match.group(1)) > 0
+    assert float(match.group(3)) > 0, (
+        "Убедитесь, что время рендеринга шаблона замеряется."
+    )
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["view"] == "blog:post_detail"
+    assert record["queries"] == int(match.group(1))
+    assert record["status"] == 200
+
+
+@override_settings(BLOG_TIMING_SAMPLE_RATE=0.25)
+def test_unsampled_requests_skipped(client, monkeypatch):
+    monkeypatch.setattr("blog.middleware.random.random", lambda: 0.5)
+    assert "Server-Timing" not in client.get("/")
+    monkeypatch.setattr("blog.middleware.random.random", lambda: 0.1)
+    assert "Server-Timing" in client.get("/")
+
+
+@override_settings(BLOG_TIMING_SAMPLE_RATE=1.0, BLOG_TIMING_HEADER=False)
+def test_header_can_be_disabled(client, caplog):
+    with caplog.at_level(logging.INFO, logger="blog.timing"):
+        response = client.get("/")
+    assert "Server-Timing" not in response
+    assert caplog.records
+
+
+@override_settings(BLOG_TIMING_SAMPLE_RATE=1.0, BLOG_TIMING_N_PLUS_ONE=5)
+def test_n_plus_one_flagged(caplog):
+    def view(request):
+        for pk in range(8):
+            list(Post.objects.filter(pk=pk))
+        list(Post.objects.filter(pk=1))
+        list(Post.objects.filter(pk__in=[1, 2, 3]))
+        list(Post.objects.filter(pk__in=[4]))
+        return HttpResponse()
+
+    middleware = RequestTimingMiddleware(view)
+    with caplog.at_level(logging.INFO, logger="blog.timing"):
+        response = middleware(RequestFactory().get("/"))
+    queries, duplicates, _ = SERVER_TIMING_RE.fullmatch(
+        response["Server-Timing"]
+    ).groups()
+    assert (int(queries), int(duplicates)) == (11, 1)
+    log = caplog.records[-1]
+    assert log.levelno == logging.WARNING, (
+        "Убедитесь, что повторы одной формы запроса помечаются как N+1."
+    )
+    repeated = json.loads(log.getMessage())["n_plus_one"]
+    assert [item["count"] for item in repeated] == [9]
+
+
+def test_sql_shape_collapses_in_lists():
+    assert get_sql_shape('WHERE "id" IN (%s, %s, %s)') == get_sql_shape(
+        'WHERE "id" IN (%s)'
+    )
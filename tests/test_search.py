@@ -0,0 +1,114 @@
+from datetime import timedelta
+from http import HTTPStatus
+from urllib.parse import urlencode
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def make_post(mixer: Mixer, user, published_category):
+    def make_post(title="Заметка", text="Обычный текст", **kwargs):
+        kwargs.setdefault("category", published_category)
+        kwargs.setdefault("is_published", True)
+        kwargs.setdefault("pub_date", timezone.now() - timedelta(days=1))
+        return mixer.blend(
+            "blog.Post", author=user, title=title, text=text, location=None,
+            **kwargs,
+        )
+    return make_post
+
+
+def search(client, query, **params):
+    response = client.get("/search/", {"q": query, **params})
+    assert response.status_code == HTTPStatus.OK
+    return response
+
+
+def found_ids(response):
+    return [post.id for post in response.context["page_obj"]]
+
+
+def test_russian_stemming(client, make_post):
+    post = make_post(title="Публикации о котах", text="Рыжие коты спят.")
+    make_post(title="Собаки", text="Про собак.")
+    response = search(client, "публикация кот")
+    assert found_ids(response) == [post.id], (
+        "Убедитесь, что поиск находит посты по разным формам слов."
+    )
+
+
+def test_visibility_rules(client, mixer: Mixer, make_post):
+    visible = make_post(text="Секретный рецепт")
+    make_post(text="Секретный рецепт", is_published=False)
+    make_post(
+        text="Секретный рецепт",
+        category=mixer.blend("blog.Category", is_published=False),
+    )
+    make_post(
+        text="Секретный рецепт", pub_date=timezone.now() + timedelta(days=1)
+    )
+    assert found_ids(search(client, "рецепт")) == [visible.id], (
+        "Убедитесь, что поиск показывает только посты, видимые в ленте."
+    )
+
+
+def test_title_matches_ranked_first(client, make_post):
+    in_text = make_post(title="Заметка", text="Про горы и горы и горы")
+    in_title = make_post(
+        title="Горы Кавказа", text="Текст", pub_date=timezone.now()
+        - timedelta(days=10)
+    )
+    assert found_ids(search(client, "горы")) == [in_title.id, in_text.id], (
+        "Убедитесь, что совпадения в заголовке ранжируются выше."
+    )
+
+
+def test_index_joined_once(client, make_post):
+    for i in range(3):
+        make_post(title=f"Поход {i}")
+    with CaptureQueriesContext(connection) as ctx:
+        search(client, "поход")
+    page_query = [q["sql"] for q in ctx.captured_queries
+                  if "ORDER BY" in q["sql"] and "blog_post_search" in q["sql"]]
+    assert len(page_query) == 1
+    assert page_query[0].count("SELECT") == 1, (
+        "Убедитесь, что таблица поиска присоединяется один раз, а не"
+        " подзапросом на каждый найденный пост."
+    )
+
+
+def test_index_follows_post_changes(client, make_post):
+    post = make_post(text="Старый текст")
+    post.text = "Новая редакция"
+    post.save()
+    assert found_ids(search(client, "редакция")) == [post.id]
+    assert not found_ids(search(client, "старый"))
+
+    post.delete()
+    assert not found_ids(search(client, "редакция")), (
+        "Убедитесь, что удалённые посты пропадают из поиска."
+    )
+
+
+def test_results_paginated(client, make_post):
+    for i in range(15):
+        make_post(title=f"Путешествие {i}")
+    response = search(client, "путешествия")
+    assert len(response.context["page_obj"]) == 10
+    link = "?" + urlencode({"q": "путешествия"}) + "&amp;page=2"
+    assert link in response.content.decode("utf-8"), (
+        "Убедитесь, что ссылки пагинатора сохраняют поисковый запрос."
+    )
+    assert len(search(client, "путешествия", page=2).context["page_obj"]) == 5
+
+
+@pytest.mark.parametrize("query", ["", "  ", "!!!"])
+def test_empty_query(client, make_post, query):
+    make_post()
+    assert not found_ids(search(client, query))
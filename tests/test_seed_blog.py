@@ -0,0 +1,86 @@
+from collections import Counter
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, F
+from django.utils import timezone
+
+from blog.models import Category, Comment, Location, Post, UserStats
+
+pytestmark = [pytest.mark.django_db]
+
+SIZES = dict(users=30, categories=4, locations=6, posts=300, comments=1500)
+
+
+def seed(**options):
+    call_command("seed_blog", stdout=StringIO(), **{**SIZES, **options})
+
+
+def get_content():
+    return list(Post.objects.order_by("pk").values_list(
+        "title", "author__username", "category__slug", "is_published",
+        "comment_count",
+    ))
+
+
+def test_seed_creates_requested_volume():
+    seed(seed=1)
+    assert get_user_model().objects.count() == SIZES["users"]
+    assert Category.objects.count() == SIZES["categories"]
+    assert Location.objects.count() == SIZES["locations"]
+    assert Post.objects.count() == SIZES["posts"]
+    assert Comment.objects.count() == SIZES["comments"]
+    assert not Post.objects.annotate(actual=Count("comments")).exclude(
+        comment_count=F("actual")
+    ).exists(), "Убедитесь, что seed_blog пересчитывает счётчики комментариев."
+    assert UserStats.objects.exists(), (
+        "Убедитесь, что seed_blog пересчитывает статистику пользователей."
+    )
+
+
+def test_seed_mixes_scheduled_and_unpublished_posts():
+    seed(seed=2, scheduled=0.2, unpublished=0.2)
+    now = timezone.now()
+    assert Post.objects.filter(pub_date__gt=now).count() > 30
+    assert Post.objects.filter(is_published=False).count() > 30
+    assert not Comment.objects.filter(post__pub_date__gt=now).exists(), (
+        "Убедитесь, что отложенные посты не получают комментариев."
+    )
+    assert not Comment.objects.filter(post__is_published=False).exists()
+    assert not Comment.objects.filter(
+        created_at__lt=F("post__pub_date")
+    ).exists(), "Убедитесь, что комментарии не старше поста."
+
+
+def test_seed_is_power_law():
+    seed(seed=3)
+    posts = Counter(Post.objects.values_list("author", flat=True))
+    top = sum(count for _, count in posts.most_common(SIZES["users"] // 10))
+    assert top > SIZES["posts"] * 0.3, (
+        "Убедитесь, что число постов у авторов распределено по степенному"
+        " закону: немногие авторы пишут большую часть постов."
+    )
+    comments = Counter(Comment.objects.values_list("post", flat=True))
+    top = sum(count for _, count in comments.most_common(SIZES["posts"] // 10))
+    assert top > SIZES["comments"] * 0.3
+
+
+def test_seed_is_deterministic():
+    seed(seed=4)
+    first = get_content()
+    Post.objects.all().delete()
+    Category.objects.all().delete()
+    get_user_model().objects.all().delete()
+    seed(seed=4)
+    assert get_content() == first, (
+        "Убедитесь, что одинаковый --seed даёт одинаковые данные."
+    )
+
+
+def test_seed_refuses_to_repeat():
+    seed(seed=5, posts=0, comments=0)
+    with pytest.raises(CommandError):
+        seed(seed=5, posts=0, comments=0)
@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BLOGICUM_DIR = Path(__file__).resolve().parent.parent / "blogicum"
+
+SETTINGS_SCRIPT = """
+import json
+import django
+from django.conf import settings
+django.setup()
+template_options = settings.TEMPLATES[0]["OPTIONS"]
+print(json.dumps({
+    "debug": settings.DEBUG,
+    "apps": settings.INSTALLED_APPS,
+    "middleware": settings.MIDDLEWARE,
+    "conn_max_age": settings.DATABASES["default"].get("CONN_MAX_AGE", 0),
+    "loaders": template_options.get("loaders"),
+    "cache": settings.CACHES["default"]["BACKEND"],
+    "metrics": settings.BLOG_METRICS_ENABLED,
+}))
+"""
+
+PROD_ENV = {
+    "DJANGO_ENV": "prod",
+    "DJANGO_SECRET_KEY": "prod-secret-key-for-tests",
+    "DJANGO_ALLOWED_HOSTS": "blogicum.example.com",
+}
+
+
+def load_settings(tmp_path, **env):
+    environ = {
+        key: value for key, value in os.environ.items()
+        if not key.startswith(("DJANGO_", "BLOG_"))
+    }
+    environ.update(DJANGO_SETTINGS_MODULE="blogicum.settings",
+                   BLOG_CACHE_LOCATION=str(tmp_path), **env)
+    return subprocess.run(
+        [sys.executable, "-c", SETTINGS_SCRIPT],
+        cwd=BLOGICUM_DIR, env=environ, capture_output=True, text=True,
+    )
+
+
+def test_dev_profile_by_default(tmp_path):
+    result = load_settings(tmp_path)
+    assert result.returncode == 0, result.stderr
+    loaded = json.loads(result.stdout)
+    assert loaded["debug"]
+    assert "debug_toolbar" in loaded["apps"]
+    assert (
+        "debug_toolbar.middleware.DebugToolbarMiddleware"
+        in loaded["middleware"]
+    )
+
+
+def test_prod_profile(tmp_path):
+    result = load_settings(tmp_path, **PROD_ENV, DJANGO_CONN_MAX_AGE="120")
+    assert result.returncode == 0, result.stderr
+    loaded = json.loads(result.stdout)
+    assert not loaded["debug"]
+    assert "debug_toolbar" not in loaded["apps"]
+    assert not any("debug_toolbar" in name for name in loaded["middleware"]), (
+        "Убедитесь, что в prod debug_toolbar не входит в цепочку middleware."
+    )
+    assert loaded["conn_max_age"] == 120, (
+        "Убедитесь, что в prod соединения с БД переиспользуются."
+    )
+    assert loaded["loaders"][0][0] == (
+        "django.template.loaders.cached.Loader"
+    ), "Убедитесь, что в prod шаблоны загружаются через кэширующий загрузчик."
+    assert "locmem" not in loaded["cache"]
+    assert not loaded["metrics"], (
+        "Убедитесь, что в prod метрики без токена и списка адресов выключены."
+    )
+
+    result = load_settings(tmp_path, **PROD_ENV, BLOG_METRICS_TOKEN="token")
+    assert json.loads(result.stdout)["metrics"]
+
+
+@pytest.mark.parametrize("env, problem", [
+    ({"DJANGO_DEBUG": "1"}, "DEBUG = True"),
+    ({"DJANGO_SECRET_KEY": ""}, "SECRET_KEY"),
+    ({"DJANGO_ALLOWED_HOSTS": ""}, "ALLOWED_HOSTS"),
+    ({"BLOG_CACHE_BACKEND":
+      "django.core.cache.backends.locmem.LocMemCache"}, "LocMemCache"),
+    ({"DJANGO_EMAIL_BACKEND":
+      "django.core.mail.backends.filebased.EmailBackend"}, "почта"),
+])
+def test_prod_refuses_dev_components(tmp_path, env, problem):
+    result = load_settings(tmp_path, **{**PROD_ENV, **env})
+    assert result.returncode != 0, (
+        "Убедитесь, что prod не запускается с компонентами для разработки."
+    )
+    assert "ImproperlyConfigured" in result.stderr
+    assert problem in result.stderr
+
+
+def test_unknown_profile(tmp_path):
+    result = load_settings(tmp_path, DJANGO_ENV="staging")
+    assert result.returncode != 0
+    assert "DJANGO_ENV" in result.stderr
@@ -0,0 +1,113 @@
+import re
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+from blog.models import UserStats
+from blog.stats import recalculate_all_user_stats
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def author_posts(
+    mixer: Mixer, user, published_category, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        posts = mixer.cycle(3).blend(
+            "blog.Post", author=user, category=published_category,
+            is_published=True, pub_date=timezone.now() - timedelta(days=1),
+        )
+        mixer.blend("blog.Post", author=user, is_published=False)
+    return posts
+
+
+def test_profile_feed_filtered_by_pk(client, user, author_posts):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(f"/profile/{user.username}/")
+    assert response.status_code == 200
+    feed = [q["sql"] for q in ctx.captured_queries
+            if re.search(r'FROM "blog_post" .*LIMIT', q["sql"])]
+    assert feed
+    for sql in feed:
+        assert 'JOIN "auth_user"' not in sql, (
+            "Убедитесь, что лента профиля не присоединяет auth_user,"
+            " а фильтруется по author_id."
+        )
+    user_queries = [q for q in ctx.captured_queries
+                    if re.search(r'FROM "auth_user"', q["sql"])]
+    assert len(user_queries) == 1, (
+        "Убедитесь, что пользователь профиля загружается один раз."
+    )
+    assert not [q for q in ctx.captured_queries
+                if 'FROM "blog_comment"' in q["sql"]], (
+        "Убедитесь, что статистика профиля не считается при просмотре."
+    )
+
+
+def test_stats_follow_posts_and_comments(
+    mixer: Mixer, client, user, another_user, author_posts,
+    django_capture_on_commit_callbacks,
+):
+    stats = UserStats.objects.get(user=user)
+    assert (stats.post_count, stats.comment_count) == (3, 0)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        comment = mixer.blend(
+            "blog.Comment", post=author_posts[0], author=user
+        )
+    stats.refresh_from_db()
+    assert stats.comment_count == 1
+    assert stats.last_activity == comment.created_at
+
+    content = client.get(f"/profile/{user.username}/").content.decode()
+    assert "Публикаций: 3" in content and "Комментариев: 1" in content, (
+        "Убедитесь, что в шапке профиля выводится статистика пользователя."
+    )
+
+    with django_capture_on_commit_callbacks(execute=True):
+        author_posts[0].delete()
+    stats.refresh_from_db()
+    assert (stats.post_count, stats.comment_count) == (2, 0)
+
+
+def test_user_without_activity(client, another_user):
+    content = client.get(f"/profile/{another_user.username}/").content
+    assert "Публикаций: 0" in content.decode()
+
+
+def test_user_deletion(user, author_posts, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        user.delete()
+    assert not UserStats.objects.exists()
+
+
+def test_recalculate_counters_fixes_stats(user, author_posts):
+    UserStats.objects.filter(user=user).update(post_count=42)
+    call_command("recalculate_counters", stdout=StringIO())
+    assert UserStats.objects.get(user=user).post_count == 3
+
+
+def test_recalculate_stats_in_constant_queries(
+    mixer: Mixer, user, another_user, author_posts
+):
+    mixer.cycle(20).blend("blog.Comment", post=author_posts[0], author=user)
+    UserStats.objects.filter(user=user).update(post_count=42)
+    UserStats.objects.create(user=another_user, post_count=7)
+    with CaptureQueriesContext(connection) as ctx:
+        users = recalculate_all_user_stats()
+    assert len(ctx.captured_queries) <= 6, (
+        "Убедитесь, что статистика всех пользователей пересчитывается"
+        " одним запросом и пишется порциями, а не по одному автору."
+    )
+    assert users == 2
+    assert UserStats.objects.get(user=user).post_count == 3
+    assert UserStats.objects.get(user=another_user).post_count == 0, (
+        "Убедитесь, что статистика без постов и комментариев обнуляется."
+    )